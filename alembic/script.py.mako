@@ -10,6 +10,8 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 ${imports if imports else ""}
+# Touching a large table (listings, notifications)? Swap autogenerated ops for
+# the online-safe versions in app/migration_helpers.py before merging.
 
 # revision identifiers, used by Alembic.
 revision: str = ${repr(up_revision)}
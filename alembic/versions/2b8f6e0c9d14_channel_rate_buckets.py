@@ -0,0 +1,33 @@
+"""channel rate buckets
+
+Revision ID: 2b8f6e0c9d14
+Revises: a6d40b9e2c71
+Create Date: 2026-10-20 10:14:37.902215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b8f6e0c9d14'
+down_revision: Union[str, Sequence[str], None] = 'a6d40b9e2c71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('channel_rate_buckets',
+    sa.Column('channel', sa.String(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('channel')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('channel_rate_buckets')
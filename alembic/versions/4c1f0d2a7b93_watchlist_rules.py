@@ -0,0 +1,36 @@
+"""watchlist rules
+
+Revision ID: 4c1f0d2a7b93
+Revises: b82b6d151642
+Create Date: 2026-10-19 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f0d2a7b93'
+down_revision: Union[str, Sequence[str], None] = 'b82b6d151642'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('watchlists', sa.Column('section_from', sa.Integer(), nullable=True))
+    op.add_column('watchlists', sa.Column('section_to', sa.Integer(), nullable=True))
+    op.add_column('watchlists', sa.Column('min_qty', sa.Integer(), nullable=True))
+    op.add_column('watchlists', sa.Column('verified_only', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('watchlists', sa.Column('max_score', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('watchlists', 'max_score')
+    op.drop_column('watchlists', 'verified_only')
+    op.drop_column('watchlists', 'min_qty')
+    op.drop_column('watchlists', 'section_to')
+    op.drop_column('watchlists', 'section_from')
@@ -0,0 +1,45 @@
+"""export change markers
+
+Revision ID: 5d91a3c7e028
+Revises: 2b8f6e0c9d14
+Create Date: 2026-10-20 11:05:48.221930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_helpers import create_index_concurrently, drop_index_concurrently, set_lock_timeout
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d91a3c7e028'
+down_revision: Union[str, Sequence[str], None] = '2b8f6e0c9d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # non-volatile default: PG 11+ stores it in the catalog, no table rewrite;
+        # existing rows read as the migration time and get exported once more
+        set_lock_timeout()
+        op.add_column('listings', sa.Column('updated_at', sa.DateTime(),
+                                            server_default=sa.text("timezone('utc', now())"), nullable=False))
+    else:
+        # SQLite can't ADD COLUMN with a non-constant default; rebuild the table
+        with op.batch_alter_table('listings', recreate='always') as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(),
+                                          server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False))
+    create_index_concurrently('ix_listings_updated_at_id', 'listings', ['updated_at', 'id'])
+    create_index_concurrently('ix_notifications_created_at_id', 'notifications', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_notifications_created_at_id', 'notifications')
+    drop_index_concurrently('ix_listings_updated_at_id', 'listings')
+    with op.batch_alter_table('listings') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -10,6 +10,10 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 
+from app.migration_helpers import (
+    add_not_null_column, add_unique_constraint_concurrently, create_index_concurrently, set_lock_timeout,
+)
+
 
 # revision identifiers, used by Alembic.
 revision: str = '938132443f40'
@@ -20,24 +24,28 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
+    # rewritten from the autogenerated ops with app/migration_helpers.py so it
+    # can run against populated tables; the resulting schema is unchanged
+    utc_now = "timezone('utc', now())" if op.get_bind().dialect.name == "postgresql" else "CURRENT_TIMESTAMP"
+    create_index_concurrently(op.f('ix_artists_name'), 'artists', ['name'], unique=True)
+    set_lock_timeout()
     op.drop_constraint(op.f('artists_name_key'), 'artists', type_='unique')
-    op.create_index(op.f('ix_artists_name'), 'artists', ['name'], unique=True)
-    op.create_index(op.f('ix_events_artist_id'), 'events', ['artist_id'], unique=False)
-    op.create_index(op.f('ix_listings_event_id'), 'listings', ['event_id'], unique=False)
-    op.create_index(op.f('ix_listings_section_id'), 'listings', ['section_id'], unique=False)
-    op.add_column('notifications', sa.Column('created_at', sa.DateTime(), nullable=False))
-    op.create_index(op.f('ix_notifications_listing_id'), 'notifications', ['listing_id'], unique=False)
-    op.create_index(op.f('ix_notifications_user_id'), 'notifications', ['user_id'], unique=False)
-    op.create_unique_constraint('uq_notifications_user_listing', 'notifications', ['user_id', 'listing_id'])
-    op.create_index(op.f('ix_sections_venue_id'), 'sections', ['venue_id'], unique=False)
+    create_index_concurrently(op.f('ix_events_artist_id'), 'events', ['artist_id'])
+    create_index_concurrently(op.f('ix_listings_event_id'), 'listings', ['event_id'])
+    create_index_concurrently(op.f('ix_listings_section_id'), 'listings', ['section_id'])
+    add_not_null_column('notifications', sa.Column('created_at', sa.DateTime()), utc_now)
+    create_index_concurrently(op.f('ix_notifications_listing_id'), 'notifications', ['listing_id'])
+    create_index_concurrently(op.f('ix_notifications_user_id'), 'notifications', ['user_id'])
+    add_unique_constraint_concurrently('uq_notifications_user_listing', 'notifications', ['user_id', 'listing_id'])
+    create_index_concurrently(op.f('ix_sections_venue_id'), 'sections', ['venue_id'])
+    create_index_concurrently(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    set_lock_timeout()
     op.drop_constraint(op.f('users_email_key'), 'users', type_='unique')
-    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    create_index_concurrently(op.f('ix_venues_name'), 'venues', ['name'], unique=True)
+    set_lock_timeout()
     op.drop_constraint(op.f('venues_name_key'), 'venues', type_='unique')
-    op.create_index(op.f('ix_venues_name'), 'venues', ['name'], unique=True)
-    op.create_index(op.f('ix_watchlists_event_id'), 'watchlists', ['event_id'], unique=False)
-    op.create_index(op.f('ix_watchlists_user_id'), 'watchlists', ['user_id'], unique=False)
-    # ### end Alembic commands ###
+    create_index_concurrently(op.f('ix_watchlists_event_id'), 'watchlists', ['event_id'])
+    create_index_concurrently(op.f('ix_watchlists_user_id'), 'watchlists', ['user_id'])
 
 
 def downgrade() -> None:
@@ -0,0 +1,30 @@
+"""listings (event_id, section_id, price) index
+
+Revision ID: a6d40b9e2c71
+Revises: f19c64b0e2d3
+Create Date: 2026-10-19 18:42:10.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d40b9e2c71'
+down_revision: Union[str, Sequence[str], None] = 'f19c64b0e2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently('ix_listings_event_section_price', 'listings', ['event_id', 'section_id', 'price'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_listings_event_section_price', 'listings')
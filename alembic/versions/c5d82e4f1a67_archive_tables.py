@@ -0,0 +1,63 @@
+"""archive tables for past events
+
+Revision ID: c5d82e4f1a67
+Revises: 7a3e91c5d204
+Create Date: 2026-10-19 13:25:40.902311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d82e4f1a67'
+down_revision: Union[str, Sequence[str], None] = '7a3e91c5d204'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_pg = op.get_bind().dialect.name == "postgresql"
+    # listings_archive is range-partitioned by event date on Postgres; the
+    # archive job adds a partition per year (services/archive.py), the default
+    # partition only catches rows that arrive before their year exists.
+    op.create_table('listings_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_when', sa.DateTime(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('section', sa.String(), nullable=True),
+    sa.Column('section_id', sa.Integer(), nullable=True),
+    sa.Column('row', sa.String(), nullable=True),
+    sa.Column('seat', sa.String(), nullable=True),
+    sa.Column('seat_num', sa.Integer(), nullable=True),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('seat_score', sa.Integer(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'event_when'),
+    **({"postgresql_partition_by": "RANGE (event_when)"} if is_pg else {})
+    )
+    if is_pg:
+        op.execute("CREATE TABLE listings_archive_default PARTITION OF listings_archive DEFAULT")
+    op.create_index(op.f('ix_listings_archive_event_id'), 'listings_archive', ['event_id'], unique=False)
+    op.create_table('notifications_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notifications_archive_user_id'), 'notifications_archive', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_notifications_archive_user_id'), table_name='notifications_archive')
+    op.drop_table('notifications_archive')
+    op.drop_index(op.f('ix_listings_archive_event_id'), table_name='listings_archive')
+    op.drop_table('listings_archive')
@@ -0,0 +1,44 @@
+"""watchlists unique (user_id, event_id)
+
+Revision ID: e3b7a9d41c58
+Revises: c5d82e4f1a67
+Create Date: 2026-10-19 15:48:03.127654
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_helpers import add_unique_constraint_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7a9d41c58'
+down_revision: Union[str, Sequence[str], None] = 'c5d82e4f1a67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # merge duplicates: keep the row with the tightest max_price (NULL = no
+    # limit = loosest), oldest id on ties; its other rule terms come with it
+    op.execute("""
+        DELETE FROM watchlists WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, event_id
+                    ORDER BY CASE WHEN max_price IS NULL THEN 1 ELSE 0 END, max_price, id
+                ) AS rn
+                FROM watchlists
+            ) ranked
+            WHERE rn > 1
+        )
+    """)
+    add_unique_constraint_concurrently('uq_watchlists_user_event', 'watchlists', ['user_id', 'event_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_watchlists_user_event', 'watchlists', type_='unique')
@@ -0,0 +1,38 @@
+"""section aliases
+
+Revision ID: f19c64b0e2d3
+Revises: e3b7a9d41c58
+Create Date: 2026-10-19 17:20:55.604821
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19c64b0e2d3'
+down_revision: Union[str, Sequence[str], None] = 'e3b7a9d41c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('section_aliases',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('alias', sa.String(), nullable=False),
+    sa.Column('section_id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['section_id'], ['sections.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('venue_id', 'alias', name='uq_section_aliases_venue_alias')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('section_aliases')
@@ -1,7 +1,10 @@
 # app/db.py
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from fastapi import Request, Response
+from sqlalchemy import create_engine, make_url, text
 from sqlalchemy.orm import sessionmaker
 
 load_dotenv()  # loads DATABASE_URL from .env
@@ -27,4 +30,107 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# ---- Read replica ------------------------------------------------
+# Optional read-only engine (e.g. a streaming replica, or a second SQLite file
+# in tests). Unset -> reads simply use the primary.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+MAX_REPLICA_LAG_SECONDS = float(os.getenv("MAX_REPLICA_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = 5            # how long a health/lag check result is reused
+REPLICA_TIMEOUT_SECONDS = 1          # connect/statement timeout so a dead replica fails fast
+READ_YOUR_WRITES_SECONDS = 10        # stick to the primary this long after a write
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+def _replica_engine(url: str):
+    # an unreachable host would otherwise hang in TCP connect for minutes
+    is_pg = make_url(url).get_backend_name() == "postgresql"
+    connect_args = {"connect_timeout": REPLICA_TIMEOUT_SECONDS} if is_pg else {}
+    return create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+
+read_engine = _replica_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+_replica_state = {"ok": False, "checked": 0.0}
+_replica_lock = threading.Lock()     # held by the one thread refreshing _replica_state
+_writes_lock = threading.Lock()
+
+def _check_replica() -> bool:
+    try:
+        with read_engine.connect() as conn:
+            if read_engine.dialect.name != "postgresql":
+                conn.execute(text("SELECT 1"))
+                return True
+            conn.execute(text(f"SET LOCAL statement_timeout = '{REPLICA_TIMEOUT_SECONDS}s'"))
+            # caught up if everything received has been replayed; otherwise age of last replay
+            lag = conn.scalar(text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            ))
+            return float(lag or 0) <= MAX_REPLICA_LAG_SECONDS
+    except Exception:
+        return False
+
+def _refresh_replica_state() -> None:
+    try:
+        _replica_state["ok"] = _check_replica()
+        _replica_state["checked"] = time.monotonic()
+    finally:
+        _replica_lock.release()
+
+def replica_available() -> bool:
+    """
+    Replica configured, reachable and not lagging. Never waits on the check:
+    a stale result starts one background refresh and the last known state is
+    served meanwhile (False until the first check completes).
+    """
+    if read_engine is engine:
+        return False
+    if time.monotonic() - _replica_state["checked"] >= REPLICA_CHECK_SECONDS and _replica_lock.acquire(blocking=False):
+        threading.Thread(target=_refresh_replica_state, name="replica-check", daemon=True).start()
+    return _replica_state["ok"]
+
+_last_writes: dict[str, float] = {}   # user id -> primary-only-until (epoch seconds)
+
+def mark_primary_reads(response: Response, user_id) -> None:
+    """
+    Call after a write so this user's next reads see it (read-your-writes).
+    Remembered per user in this process, and returned in a response header
+    that the client echoes back so other worker processes honour it too.
+    """
+    now = time.time()
+    until = now + READ_YOUR_WRITES_SECONDS
+    with _writes_lock:
+        if len(_last_writes) > 10_000:
+            for uid in [u for u, t in _last_writes.items() if t <= now]:
+                del _last_writes[uid]
+        _last_writes[str(user_id)] = until
+    response.headers[READ_YOUR_WRITES_HEADER] = f"{until:.0f}"
+
+def _recently_wrote(request: Request, user_id=None) -> bool:
+    now = time.time()
+    if user_id is not None and _last_writes.get(str(user_id), 0) > now:
+        return True
+    try:
+        return float(request.headers.get(READ_YOUR_WRITES_HEADER, 0)) > now
+    except ValueError:
+        return False
+
+def read_session(request: Request, user_id=None):
+    """
+    Body of the read-only dependencies: the replica unless it is
+    missing/unhealthy/lagging or this user wrote recently, in which case the
+    primary. Never commit here.
+    """
+    if _recently_wrote(request, user_id) or not replica_available():
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request):
+    """FastAPI dependency for anonymous read-only routes (see read_session)."""
+    yield from read_session(request)
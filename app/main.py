@@ -1,17 +1,23 @@
 # app/main.py
 from __future__ import annotations
 import atexit
+import os
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from .db import engine, SessionLocal
+from .db import READ_YOUR_WRITES_HEADER, engine, read_engine, SessionLocal
 from .models import Base
 from .routes_auth import router as auth_router
 from .routes_events import router as events_router
+from .routes_tour import router as tour_router
 from .routes_watch import router as watch_router
+from .services.compress import stats_snapshot as compression_stats
+from .services.archive import archive_finished_events
 from .services.notify import scan_watchlists
+from .services.sections import backfill_section_ids
+from .services.outbox import deliver_batch
 
 app = FastAPI(title="ConcertCloud API")
 
@@ -21,6 +27,7 @@ app.add_middleware(
     allow_origins=["http://127.0.0.1:5173", "http://localhost:5173"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_YOUR_WRITES_HEADER],
 )
 
 # Ensure tables exist in dev (Alembic is your source of truth)
@@ -34,9 +41,35 @@ def root():
 def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics/pool", include_in_schema=False)
+def pool_metrics():
+    """
+    Connection pool usage of the primary and read engines (load tests poll this).
+    Each worker process has its own pools and answers for itself, hence the pid.
+    """
+    out = {"pid": os.getpid()}
+    for name, eng in (("primary", engine), ("read", read_engine)):
+        pool = eng.pool
+        size = pool.size() if hasattr(pool, "size") else None
+        out[name] = {
+            "size": size,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+        }
+    return out
+
+@app.get("/metrics/compression", include_in_schema=False)
+def compression_metrics():
+    s = compression_stats()
+    s["bytes_saved"] = s["raw_bytes"] - s["sent_bytes"]
+    s["cpu_ms_per_compressed"] = 1000 * s["compress_cpu_seconds"] / max(s["compressed"], 1)
+    return s
+
 # Routers
 app.include_router(auth_router)
 app.include_router(events_router)
+app.include_router(tour_router)
 app.include_router(watch_router)
 
 # Background job: scan watchlists every 2 minutes
@@ -51,6 +84,37 @@ def _scan_job():
     finally:
         db.close()
 
+def _deliver_job():
+    db = SessionLocal()
+    try:
+        sent = deliver_batch(db)
+        if sent:
+            print(f"[watch] delivered {sent} digests")
+    finally:
+        db.close()
+
+def _archive_job():
+    db = SessionLocal()
+    try:
+        moved = archive_finished_events(db)
+        if moved:
+            print(f"[archive] moved {moved} listings of finished events")
+    finally:
+        db.close()
+
+def _sections_job():
+    db = SessionLocal()
+    try:
+        fixed = backfill_section_ids(db)
+        if fixed:
+            print(f"[sections] resolved section_id for {fixed} listings")
+    finally:
+        db.close()
+
 scheduler.add_job(_scan_job, "interval", minutes=2, id="watch_scan", replace_existing=True)
+# in-process delivery for dev; production runs `python -m app.services.outbox` workers
+scheduler.add_job(_deliver_job, "interval", seconds=30, id="outbox_deliver", replace_existing=True)
+scheduler.add_job(_archive_job, "interval", hours=1, id="archive_events", replace_existing=True)
+scheduler.add_job(_sections_job, "interval", minutes=10, id="section_backfill", replace_existing=True)
 scheduler.start()
 atexit.register(lambda: scheduler.shutdown(wait=False))
@@ -0,0 +1,172 @@
+# app/migration_helpers.py
+"""
+Online-safe building blocks for Alembic migrations on big tables.
+
+Autogenerate emits plain CREATE INDEX / ADD COLUMN .. NOT NULL / ADD CONSTRAINT,
+each of which takes a lock that blocks ingestion (and often reads) for as long
+as Postgres needs to scan `listings`. Conventions for new migrations:
+
+- indexes on existing tables: create_index_concurrently / drop_index_concurrently
+- unique constraints: add_unique_constraint_concurrently (index first, then attach)
+- foreign keys and CHECKs: add the constraint NOT VALID, then validate_constraint
+  (validation only takes SHARE UPDATE EXCLUSIVE, writes keep flowing)
+- NOT NULL columns on existing tables: add_not_null_column (nullable add,
+  chunked backfill, validated CHECK, then SET NOT NULL without a rescan)
+- data fixes: chunked_backfill, never one UPDATE over the whole table
+- every DDL statement runs under a short lock_timeout, so a migration that
+  cannot get its lock fails fast instead of queueing everyone behind it; the
+  timeout is SET LOCAL, so it ends with the transaction and never reaches the
+  CONCURRENTLY builds, which must wait out long transactions rather than fail
+- offline (`alembic upgrade --sql`) scripts get a single UPDATE per backfill
+  and no invalid-index check, since nothing can be read from the database
+
+On non-Postgres dialects (SQLite in tests) the helpers fall back to the plain
+ops, through batch_alter_table where SQLite can't ALTER in place.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from typing import Callable
+
+import sqlalchemy as sa
+from alembic import context, op
+
+LOCK_TIMEOUT = "3s"
+
+def _is_pg() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+def set_lock_timeout(timeout: str = LOCK_TIMEOUT) -> None:
+    """
+    Fail instead of waiting (and blocking the queue behind us) if a lock isn't
+    free. Lasts until the current transaction ends, i.e. at the latest until
+    the next autocommit_block commits it.
+    """
+    if _is_pg():
+        op.execute(f"SET LOCAL lock_timeout = '{timeout}'")
+
+def _drop_invalid_index(name: str, table: str) -> None:
+    """A failed or cancelled CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would keep."""
+    if context.is_offline_mode():
+        return
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+def create_index_concurrently(name: str, table: str, columns: list[str], unique: bool = False, **kw) -> None:
+    if not _is_pg():
+        op.create_index(name, table, columns, unique=unique, **kw)
+        return
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(name, table)
+        op.create_index(name, table, columns, unique=unique,
+                        postgresql_concurrently=True, if_not_exists=True, **kw)
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    if not _is_pg():
+        op.drop_index(name, table_name=table)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+def add_unique_constraint_concurrently(name: str, table: str, columns: list[str]) -> None:
+    """Build the unique index online, then attach it as a constraint (metadata-only)."""
+    if not _is_pg():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_unique_constraint(name, columns)
+        return
+    create_index_concurrently(name, table, columns, unique=True)
+    set_lock_timeout()
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+
+def add_check_not_valid(name: str, table: str, condition: str) -> None:
+    if not _is_pg():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_check_constraint(name, sa.text(condition))
+        return
+    set_lock_timeout()
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID")
+
+def add_foreign_key_not_valid(name: str, table: str, referent: str,
+                              local_cols: list[str], remote_cols: list[str]) -> None:
+    if not _is_pg():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_foreign_key(name, referent, local_cols, remote_cols)
+        return
+    set_lock_timeout()
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({', '.join(local_cols)}) "
+        f"REFERENCES {referent} ({', '.join(remote_cols)}) NOT VALID"
+    )
+
+def validate_constraint(name: str, table: str) -> None:
+    """Scan existing rows for a NOT VALID constraint while allowing reads and writes."""
+    if not _is_pg():
+        return
+    # commit first so the brief ADD CONSTRAINT lock isn't held through the scan
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+def chunked_backfill(table: str, set_sql: str, where_sql: str = "TRUE", key: str = "id",
+                     batch_size: int = 5000, pause: float = 0.05,
+                     progress: Callable[[str], None] = print) -> int:
+    """
+    UPDATE `table` SET <set_sql> WHERE <where_sql>, one key range at a time with
+    a commit and a short pause between batches so row locks are held briefly
+    and replicas keep up. Returns # rows updated (0 in offline mode).
+    """
+    if context.is_offline_mode():
+        # no key range to read from a --sql script: emit one UPDATE, the operator batches it if needed
+        op.execute(f"UPDATE {table} SET {set_sql} WHERE {where_sql}")
+        return 0
+    bind = op.get_bind()
+    lo, hi = bind.execute(sa.text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).one()
+    if lo is None:
+        return 0
+    total_span = hi - lo + 1
+    updated = 0
+    started = time.monotonic()
+    # per-batch commits on Postgres; elsewhere (SQLite tests) stay in the migration's transaction
+    with op.get_context().autocommit_block() if _is_pg() else nullcontext():
+        start = lo
+        while start <= hi:
+            end = start + batch_size
+            res = bind.execute(sa.text(
+                f"UPDATE {table} SET {set_sql} WHERE {key} >= :start AND {key} < :end AND ({where_sql})"
+            ), {"start": start, "end": end})
+            updated += res.rowcount or 0
+            start = end
+            done = min(start - lo, total_span)
+            rate = updated / max(time.monotonic() - started, 1e-6)
+            progress(f"[backfill] {table}: {done}/{total_span} keys ({done / total_span:.0%}), "
+                     f"{updated} rows, {rate:.0f} rows/s")
+            if pause:
+                time.sleep(pause)
+    return updated
+
+def add_not_null_column(table: str, column: sa.Column, backfill_sql: str, **backfill_kw) -> None:
+    """
+    Add a NOT NULL column to a populated table without a long ACCESS EXCLUSIVE lock:
+    nullable add -> chunked backfill -> CHECK NOT VALID -> VALIDATE -> SET NOT NULL
+    (Postgres 12+ skips the full scan when a validated IS NOT NULL check exists).
+    """
+    name = column.name
+    column.nullable = True
+    set_lock_timeout()
+    op.add_column(table, column)
+    chunked_backfill(table, f"{name} = {backfill_sql}", f"{name} IS NULL", **backfill_kw)
+    if not _is_pg():
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(name, nullable=False)
+        return
+    check = f"ck_{table}_{name}_not_null"
+    add_check_not_valid(check, table, f"{name} IS NOT NULL")
+    validate_constraint(check, table)
+    set_lock_timeout()
+    op.alter_column(table, name, nullable=False)
+    op.drop_constraint(check, table, type_="check")
@@ -5,8 +5,8 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
-    String, Boolean, Integer, Float, DateTime, Numeric,
-    ForeignKey, UniqueConstraint
+    String, Boolean, Integer, Float, DateTime, Numeric, JSON,
+    ForeignKey, UniqueConstraint, Index
 )
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -51,6 +51,16 @@ class Section(Base):
 
     venue: Mapped["Venue"] = relationship(back_populates="sections")
 
+class SectionAlias(Base):
+    """Normalised feed label -> Section for one venue (e.g. "FLRB", "SEC101")."""
+    __tablename__ = "section_aliases"
+    __table_args__ = (UniqueConstraint("venue_id", "alias", name="uq_section_aliases_venue_alias"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    venue_id: Mapped[int] = mapped_column(ForeignKey("venues.id"), nullable=False)
+    alias: Mapped[str] = mapped_column(String, nullable=False)
+    section_id: Mapped[int] = mapped_column(ForeignKey("sections.id"), nullable=False)
+    source: Mapped[str] = mapped_column(String, nullable=False, default="manual")  # manual | suggested (fuzzy, unreviewed)
+
 
 # ---- Artist / Event / Listing ----------------------------------
 class Artist(Base):
@@ -65,10 +75,15 @@ class Event(Base):
     artist_id: Mapped[int] = mapped_column(ForeignKey("artists.id"), nullable=False, index=True)
     venue: Mapped[str] = mapped_column(String, nullable=False)
     when: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    status: Mapped[str] = mapped_column(String, default="onsale")
+    status: Mapped[str] = mapped_column(String, default="onsale")   # onsale -> finished -> archived
 
 class Listing(Base):
     __tablename__ = "listings"
+    __table_args__ = (
+        # map viewport / nearest-seat lookups: event_id = ? AND section_id IN (...) ORDER BY price
+        Index("ix_listings_event_section_price", "event_id", "section_id", "price"),
+        Index("ix_listings_updated_at_id", "updated_at", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False, index=True)
     section: Mapped[str] = mapped_column(String)                   # free-text label like "101"
@@ -79,20 +94,89 @@ class Listing(Base):
     price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
     seat_score: Mapped[int] = mapped_column(Integer, default=100)  # lower = better (fallback)
     is_verified: Mapped[bool] = mapped_column(Boolean, default=True)
+    # change marker for the analytics export; bulk UPDATEs must set it too
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+# ---- Cold storage for past events ------------------------------
+# Filled by services/archive.py once an event is finished, so `listings` and
+# `notifications` (and their indexes) only hold live inventory. On Postgres
+# listings_archive is range-partitioned by event date (see migration).
+class ListingArchive(Base):
+    __tablename__ = "listings_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (event_when)"}
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    event_when: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    event_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    section: Mapped[str | None] = mapped_column(String)
+    section_id: Mapped[int | None] = mapped_column(Integer)
+    row: Mapped[str | None] = mapped_column(String)
+    seat: Mapped[str | None] = mapped_column(String)
+    seat_num: Mapped[int | None] = mapped_column(Integer)
+    price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
+    seat_score: Mapped[int | None] = mapped_column(Integer)
+    is_verified: Mapped[bool | None] = mapped_column(Boolean)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+class NotificationArchive(Base):
+    __tablename__ = "notifications_archive"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False, index=True)
+    listing_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    event_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 # ---- Watchlists / Notifications --------------------------------
 class Watchlist(Base):
     __tablename__ = "watchlists"
+    __table_args__ = (UniqueConstraint("user_id", "event_id", name="uq_watchlists_user_event"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[uuid.UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False, index=True)
     event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False, index=True)
     max_price: Mapped[Numeric | None] = mapped_column(Numeric(10, 2))
+    # optional rule terms; NULL / False means "any"
+    section_from: Mapped[int | None] = mapped_column(Integer)      # numeric section range, inclusive
+    section_to: Mapped[int | None] = mapped_column(Integer)
+    min_qty: Mapped[int | None] = mapped_column(Integer)           # seats together in one row
+    verified_only: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    max_score: Mapped[float | None] = mapped_column(Float)         # best-score ceiling (lower = better)
 
 class Notification(Base):
     __tablename__ = "notifications"
-    __table_args__ = (UniqueConstraint("user_id", "listing_id", name="uq_notifications_user_listing"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "listing_id", name="uq_notifications_user_listing"),
+        Index("ix_notifications_created_at_id", "created_at", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[uuid.UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False, index=True)
     listing_id: Mapped[int] = mapped_column(ForeignKey("listings.id"), nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# ---- Notification outbox ---------------------------------------
+# Written in the same transaction as the Notification rows; delivery workers
+# claim pending rows (FOR UPDATE SKIP LOCKED) and send them per channel.
+class OutboxMessage(Base):
+    __tablename__ = "notification_outbox"
+    __table_args__ = (Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False, index=True)
+    channel: Mapped[str] = mapped_column(String, nullable=False, default="file")
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")  # pending | sending | sent | failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by: Mapped[str | None] = mapped_column(String)
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime)
+    last_error: Mapped[str | None] = mapped_column(String)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ChannelRateBucket(Base):
+    """Token bucket per delivery channel, shared by every outbox worker process."""
+    __tablename__ = "channel_rate_buckets"
+    channel: Mapped[str] = mapped_column(String, primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -1,62 +1,101 @@
 # app/routes_events.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import select
 from sqlalchemy.orm import Session
-from math import sqrt
-from statistics import median
 
-from .db import get_db
-from .models import Event, Venue, Section, Listing
+from .db import get_read_db
+from .models import Event, Listing
+from .services.compress import compressed_json
+from .services.ranking import price_bounds, score_listing, together_runs, venue_context, view_score
+from .services.venues import get_venue_geometry
 
 router = APIRouter(prefix="/events", tags=["events"])
 
 # ---------- helpers ----------
-def _norm(x: float, lo: float, hi: float) -> float:
-    if hi == lo:
-        return 0.0
-    v = (x - lo) / (hi - lo)
-    return min(1.0, max(0.0, v))
-
-def _row_depth(row: str | None) -> int:
-    if not row:
-        return 10
-    if row.isdigit():
-        return int(row)
-    alpha = "".join(ch for ch in row.upper() if ch.isalpha())
-    if not alpha:
-        return 10
-    depth = 0
-    for ch in alpha:
-        depth = depth * 26 + (ord(ch) - 64)  # A=1
-    return depth
-
-def _score_listing(lst: Listing, sec_by_id: dict[int, Section], venue_xy: dict, p_lo: float, p_hi: float) -> float:
+def _pareto_frontier(items: list[Listing], view: dict[int, float]) -> list[Listing]:
     """
-    Lower is better. Blend:
-      distance (0.6) + row depth (0.15) + price (0.25)
+    Skyline over (price, view score), both lower-is-better. A listing survives
+    unless another one is at least as good on both axes and strictly better on one.
+    Sort by (price, view) once, then a single sweep keeping the best view seen
+    so far: O(n log n). Returned cheapest first.
     """
-    price = float(lst.price)
-    price_n = _norm(price, p_lo, p_hi)
-
-    if lst.section_id and lst.section_id in sec_by_id:
-        s = sec_by_id[lst.section_id]
-        dx = s.cx - venue_xy["stage_x"]
-        dy = s.cy - venue_xy["stage_y"]
-        dist = sqrt(dx * dx + dy * dy)
-        dist_n = _norm(dist, 0, 1000)  # canvas is ~0..1000
+    ordered = sorted(items, key=lambda x: (float(x.price), view[x.id], x.id))
+    frontier = []
+    best_view = float("inf")
+    i = 0
+    while i < len(ordered):
+        # listings tied on price only compete on view; the first of the group
+        # holds the group's best view, so exact ties all survive
+        price = float(ordered[i].price)
+        j = i
+        while j < len(ordered) and float(ordered[j].price) == price:
+            j += 1
+        group_best = view[ordered[i].id]
+        if group_best < best_view:
+            frontier.extend(x for x in ordered[i:j] if view[x.id] == group_best)
+            best_view = group_best
+        i = j
+    return frontier
+
+def _serialize_listing(it: Listing) -> dict:
+    return {
+        "id": it.id,
+        "event_id": it.event_id,
+        "section": it.section,
+        "section_id": it.section_id,
+        "row": it.row,
+        "seat": it.seat,
+        "seat_num": it.seat_num,
+        "price": float(it.price),
+        "is_verified": it.is_verified,
+    }
+
+def _section_listings(
+    db: Session, event_id: int, geo, section_ids: list[int], sort: str, limit: int,
+    max_price: float | None, verified_only: bool, order: dict[int, float] | None = None,
+) -> list[Listing]:
+    """
+    Listings of an event restricted to the given sections (an indexed
+    section_id IN (...) lookup). cheapest sorts and limits in SQL; best and
+    distance need every candidate, so they sort here.
+    """
+    if not section_ids:
+        return []
+    stmt = select(Listing).where(Listing.event_id == event_id, Listing.section_id.in_(section_ids))
+    if verified_only:
+        stmt = stmt.where(Listing.is_verified == True)
+    if max_price is not None:
+        stmt = stmt.where(Listing.price <= max_price)
+    if sort == "cheapest":
+        return list(db.scalars(stmt.order_by(Listing.price, Listing.id).limit(limit)).all())
+
+    items = db.scalars(stmt).all()
+    if sort == "distance" and order is not None:
+        items.sort(key=lambda x: (order[x.section_id], float(x.price), x.id))
     else:
-        # fallback if not mapped to a section
-        dist_n = _norm(lst.seat_score, 0, 100)
+        p_lo, p_hi = price_bounds(items)
+        items.sort(key=lambda x: (score_listing(x, geo.sections, geo.venue_xy, p_lo, p_hi), x.id))
+    return items[:limit]
 
-    row_n = _norm(_row_depth(lst.row), 1, 30)
+def _require_finite(**coords: float) -> None:
+    bad = [name for name, v in coords.items() if not math.isfinite(v)]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"coordinates must be finite: {', '.join(bad)}")
 
-    return 0.6 * dist_n + 0.15 * row_n + 0.25 * price_n
+def _event_geometry(db: Session, event_id: int):
+    ev = db.get(Event, event_id)
+    if not ev:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return get_venue_geometry(db, ev.venue)
 
 # ---------- endpoints ----------
 @router.get("/{event_id}/listings")
 def get_listings(
+    request: Request,
     event_id: int,
     sort: str = "cheapest",
     qty: int = Query(1, ge=1, le=8),
@@ -64,7 +103,7 @@ def get_listings(
     max_price: float | None = None,
     verified_only: bool = False,
     section_id: int | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     # base query
     stmt = select(Listing).where(Listing.event_id == event_id)
@@ -79,28 +118,7 @@ def get_listings(
 
     # together filter (find runs of consecutive seat_num)
     if together and qty > 1:
-        grouped = {}
-        for x in items:
-            key = (x.section_id or 0, x.section or "", x.row or "")
-            grouped.setdefault(key, []).append(x)
-        kept = []
-        for _, arr in grouped.items():
-            arr.sort(key=lambda a: (a.seat_num or 10**9, a.id))
-            run = []
-            last = None
-            for a in arr:
-                if a.seat_num is None:
-                    continue
-                if last is None or a.seat_num == last + 1:
-                    run.append(a)
-                else:
-                    if len(run) >= qty:
-                        kept.extend(run)  # keep the whole run
-                    run = [a]
-                last = a.seat_num
-            if len(run) >= qty:
-                kept.extend(run)
-        items = kept
+        items = together_runs(items, qty)
 
     # sorting
     if sort == "cheapest":
@@ -110,60 +128,116 @@ def get_listings(
         if not ev:
             raise HTTPException(status_code=404, detail="Event not found")
 
-        vrow = db.execute(select(Venue).where(Venue.name == ev.venue)).scalar_one_or_none()
-        if vrow:
-            venue_xy = {"stage_x": vrow.stage_x, "stage_y": vrow.stage_y}
-            secs = db.scalars(select(Section).where(Section.venue_id == vrow.id)).all()
-            sec_by_id = {s.id: s for s in secs}
-        else:
-            venue_xy = {"stage_x": 500.0, "stage_y": 80.0}
-            sec_by_id = {}
-
-        prices = [float(x.price) for x in items] or [0.0]
-        p_lo = min(prices)
-        p_hi = max(median(prices), p_lo + 1e-6)
-        items.sort(key=lambda x: _score_listing(x, sec_by_id, venue_xy, p_lo, p_hi))
+        venue_xy, sec_by_id = venue_context(db, ev.venue)
+        p_lo, p_hi = price_bounds(items)
+        items.sort(key=lambda x: score_listing(x, sec_by_id, venue_xy, p_lo, p_hi))
 
     # serialize
+    return compressed_json(request, [_serialize_listing(it) for it in items],
+                           key=f"listings:{event_id}?{request.url.query}")
+
+@router.get("/{event_id}/frontier")
+def get_frontier(
+    event_id: int,
+    qty: int = Query(1, ge=1, le=8),
+    together: bool = False,
+    max_price: float | None = None,
+    verified_only: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    """Non-dominated listings on price vs. view: nothing else is both cheaper and better placed."""
+    ev = db.get(Event, event_id)
+    if not ev:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    stmt = select(Listing).where(Listing.event_id == event_id)
+    if verified_only:
+        stmt = stmt.where(Listing.is_verified == True)
+    if max_price is not None:
+        stmt = stmt.where(Listing.price <= max_price)
+    items = db.scalars(stmt).all()
+
+    if together and qty > 1:
+        items = together_runs(items, qty)
+
+    venue_xy, sec_by_id = venue_context(db, ev.venue)
+    view = {x.id: view_score(x, sec_by_id, venue_xy) for x in items}
     return [
-        {
-            "id": it.id,
-            "event_id": it.event_id,
-            "section": it.section,
-            "section_id": it.section_id,
-            "row": it.row,
-            "seat": it.seat,
-            "seat_num": it.seat_num,
-            "price": float(it.price),
-            "is_verified": it.is_verified,
-        }
-        for it in items
+        {**_serialize_listing(it), "view_score": round(view[it.id], 4)}
+        for it in _pareto_frontier(items, view)
     ]
 
 @router.get("/{event_id}/map")
-def get_map(event_id: int, db: Session = Depends(get_db)):
+def get_map(request: Request, event_id: int, db: Session = Depends(get_read_db)):
     ev = db.get(Event, event_id)
     if not ev:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    v = db.execute(select(Venue).where(Venue.name == ev.venue)).scalar_one_or_none()
+    v = get_venue_geometry(db, ev.venue)
     if not v:
         return {"venue": {"name": ev.venue, "width": 1000, "height": 700, "stage_x": 500, "stage_y": 80},
                 "sections": [], "cheapest": None, "best": None}
 
-    secs = db.scalars(select(Section).where(Section.venue_id == v.id)).all()
+    secs = list(v.sections.values())
     # markers
     listings = db.scalars(select(Listing).where(Listing.event_id == event_id)).all()
     cheapest = min(listings, key=lambda x: float(x.price)) if listings else None
 
-    prices = [float(x.price) for x in listings] or [0.0]
-    p_lo, p_hi = (min(prices), max(median(prices), min(prices) + 1e-6))
-    sec_by_id = {s.id: s for s in secs}
-    best = min(listings, key=lambda x: _score_listing(x, sec_by_id, {"stage_x": v.stage_x, "stage_y": v.stage_y}, p_lo, p_hi)) if listings else None
+    p_lo, p_hi = price_bounds(listings)
+    best = min(listings, key=lambda x: score_listing(x, v.sections, v.venue_xy, p_lo, p_hi)) if listings else None
 
-    return {
+    return compressed_json(request, {
         "venue": {"name": v.name, "width": v.width, "height": v.height, "stage_x": v.stage_x, "stage_y": v.stage_y},
         "sections": [{"id": s.id, "name": s.name, "cx": s.cx, "cy": s.cy, "base_closeness": s.base_closeness} for s in secs],
         "cheapest": cheapest and {"listing_id": cheapest.id, "price": float(cheapest.price), "section_id": cheapest.section_id},
         "best": best and {"listing_id": best.id, "price": float(best.price), "section_id": best.section_id},
+    }, key=f"map:{event_id}")
+
+@router.get("/{event_id}/map/viewport")
+def get_map_viewport(
+    event_id: int,
+    x0: float,
+    y0: float,
+    x1: float,
+    y1: float,
+    sort: str = Query("cheapest", pattern="^(cheapest|best)$"),
+    limit: int = Query(200, ge=1, le=1000),
+    max_price: float | None = None,
+    verified_only: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    """Listings in sections whose centroid falls inside the visible map rectangle."""
+    _require_finite(x0=x0, y0=y0, x1=x1, y1=y1)
+    v = _event_geometry(db, event_id)
+    if not v:
+        return {"sections": [], "listings": []}
+
+    section_ids = sorted(s.id for s in v.grid.in_rect(x0, y0, x1, y1))
+    items = _section_listings(db, event_id, v, section_ids, sort, limit, max_price, verified_only)
+    return {"sections": section_ids, "listings": [_serialize_listing(it) for it in items]}
+
+@router.get("/{event_id}/map/nearest")
+def get_map_nearest(
+    event_id: int,
+    x: float,
+    y: float,
+    k: int = Query(5, ge=1, le=50, description="sections to search around the point"),
+    n: int = Query(20, ge=1, le=200, description="listings to return"),
+    sort: str = Query("distance", pattern="^(distance|cheapest|best)$"),
+    max_price: float | None = None,
+    verified_only: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    """Best n listings in the k sections nearest to a clicked map point."""
+    _require_finite(x=x, y=y)
+    v = _event_geometry(db, event_id)
+    if not v:
+        return {"sections": [], "listings": []}
+
+    near = v.grid.nearest(x, y, k)
+    dist = {s.id: d for s, d in near}
+    items = _section_listings(db, event_id, v, list(dist), sort, n, max_price, verified_only, order=dist)
+    return {
+        "sections": [{"id": s.id, "name": s.name, "distance": round(d, 2)} for s, d in near],
+        "listings": [{**_serialize_listing(it), "distance": round(dist[it.section_id], 2)} for it in items],
     }
@@ -0,0 +1,82 @@
+# app/routes_tour.py
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .db import get_read_db
+from .models import Event, Listing
+from .services.ranking import DEFAULT_VENUE, best_scores
+from .services.venues import get_venue_geometries
+
+router = APIRouter(prefix="/tour", tags=["tour"])
+
+# ---------- helpers ----------
+def _tour_item(x: Listing, score: float) -> dict:
+    return {
+        "id": x.id,
+        "section": x.section,
+        "section_id": x.section_id,
+        "row": x.row,
+        "seat": x.seat,
+        "seat_num": x.seat_num,
+        "price": float(x.price),
+        "is_verified": x.is_verified,
+        "score": round(score, 4),
+    }
+
+# ---------- endpoints ----------
+@router.get("/best")
+def tour_best(
+    artist_id: int | None = None,
+    event_ids: list[int] | None = Query(None),
+    k: int = Query(3, ge=1, le=20),
+    max_price: float | None = None,
+    verified_only: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Top-k best and cheapest listings for every date of a tour (an artist's events,
+    or an explicit list of event ids). "best" is ranking.best_scores, the blend
+    behind /events/{id}/listings?sort=best, over each event's own venue map and
+    filtered listings, so it agrees with the per-event calls it replaces. One
+    listings query for the whole tour; the per-event calls loaded the same rows.
+    """
+    if artist_id is None and not event_ids:
+        raise HTTPException(status_code=422, detail="Pass artist_id or event_ids")
+
+    ev_stmt = select(Event)
+    if artist_id is not None:
+        ev_stmt = ev_stmt.where(Event.artist_id == artist_id)
+    if event_ids:
+        ev_stmt = ev_stmt.where(Event.id.in_(event_ids))
+    events = db.scalars(ev_stmt.order_by(Event.when)).all()
+    if not events:
+        return []
+
+    geos = get_venue_geometries(db, [ev.venue for ev in events])
+
+    stmt = select(Listing).where(Listing.event_id.in_([ev.id for ev in events]))
+    if verified_only:
+        stmt = stmt.where(Listing.is_verified == True)
+    if max_price is not None:
+        stmt = stmt.where(Listing.price <= max_price)
+    by_event: dict[int, list[Listing]] = {}
+    for x in db.scalars(stmt.order_by(Listing.event_id, Listing.id)):
+        by_event.setdefault(x.event_id, []).append(x)
+
+    out = []
+    for ev in events:
+        items = by_event.get(ev.id, [])
+        geo = geos.get(ev.venue)
+        scores = best_scores(items, geo.sections if geo else {}, geo or DEFAULT_VENUE)
+        best = sorted(items, key=lambda x: (scores[x.id], x.id))[:k]
+        cheapest = sorted(items, key=lambda x: (float(x.price), x.id))[:k]
+        out.append({
+            "event_id": ev.id, "venue": ev.venue, "when": ev.when, "status": ev.status,
+            "mapped": geo is not None,
+            "best": [_tour_item(x, scores[x.id]) for x in best],
+            "cheapest": [_tour_item(x, scores[x.id]) for x in cheapest],
+        })
+    return out
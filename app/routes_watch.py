@@ -3,32 +3,47 @@ from __future__ import annotations
 import os, uuid
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Path
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
+from pydantic import BaseModel, Field, model_validator
 from jose import jwt, JWTError
-from sqlalchemy import select
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from .db import get_db, mark_primary_reads, read_session
 from .models import User, Watchlist, Notification, Listing
+from .services.watch_index import invalidate_event_rules
 
 router = APIRouter(prefix="/watch", tags=["watchlists"])
 
 JWT_SECRET = os.getenv("JWT_SECRET", "please-change-me")
 JWT_ALG = "HS256"
 
-def get_current_user(Authorization: str = Header(...), db: Session = Depends(get_db)) -> User:
-    if not Authorization.startswith("Bearer "):
+def current_user_id(Authorization: str = Header(...)) -> uuid.UUID:
+    """Bearer token -> user id, without touching the database."""
+    scheme, _, token = Authorization.partition(" ")
+    if scheme != "Bearer" or not token:
         raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = Authorization.split()[1]
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-    except JWTError:
+        return uuid.UUID(payload.get("sub") or "")
+    except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
-    uid = payload.get("sub")
-    if not uid:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.get(User, uuid.UUID(uid))
+
+def get_current_user(uid: uuid.UUID = Depends(current_user_id), db: Session = Depends(get_db)) -> User:
+    user = db.get(User, uid)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+def get_user_read_db(request: Request, uid: uuid.UUID = Depends(current_user_id)):
+    """Read session for a signed-in user: the primary for a few seconds after they wrote."""
+    yield from read_session(request, uid)
+
+def get_current_reader(uid: uuid.UUID = Depends(current_user_id), db: Session = Depends(get_user_read_db)) -> User:
+    """get_current_user for read routes: loads the user on the route's read session."""
+    user = db.get(User, uid)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -36,26 +51,104 @@ def get_current_user(Authorization: str = Header(...), db: Session = Depends(get
 class WatchIn(BaseModel):
     event_id: int
     max_price: float | None = None
+    section_from: int | None = None
+    section_to: int | None = None
+    min_qty: int | None = Field(None, ge=1, le=8)
+    verified_only: bool = False
+    max_score: float | None = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def _check_section_range(self):
+        if self.section_from is not None and self.section_to is not None and self.section_from > self.section_to:
+            raise ValueError("section_from must be <= section_to")
+        return self
+
+def _watch_out(x: Watchlist) -> dict:
+    return {
+        "id": x.id,
+        "event_id": x.event_id,
+        "max_price": float(x.max_price) if x.max_price is not None else None,
+        "section_from": x.section_from,
+        "section_to": x.section_to,
+        "min_qty": x.min_qty,
+        "verified_only": x.verified_only,
+        "max_score": x.max_score,
+    }
+
+_RULE_COLUMNS = ("max_price", "section_from", "section_to", "min_qty", "verified_only", "max_score")
+
+def _upsert_watches(db: Session, user_id: uuid.UUID, items: list[WatchIn]) -> list[Watchlist]:
+    """
+    Create-or-replace one watch per (user, event) in a single INSERT .. ON CONFLICT.
+    Later entries for the same event win.
+    """
+    rows = {
+        w.event_id: {
+            "user_id": user_id,
+            "event_id": w.event_id,
+            "max_price": Decimal(str(w.max_price)) if w.max_price is not None else None,
+            "section_from": w.section_from,
+            "section_to": w.section_to,
+            "min_qty": w.min_qty,
+            "verified_only": w.verified_only,
+            "max_score": w.max_score,
+        }
+        for w in items
+    }
+    if not rows:
+        return []
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(Watchlist).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Watchlist.user_id, Watchlist.event_id],
+        set_={c: stmt.excluded[c] for c in _RULE_COLUMNS},
+    ).returning(Watchlist)
+    out = db.scalars(stmt, execution_options={"populate_existing": True}).all()
+    db.commit()
+    return out
+
+class WatchBulkIn(BaseModel):
+    items: list[WatchIn] = Field(..., max_length=500)
 
 @router.post("/watchlists")
-def add_watch(w: WatchIn, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    wl = Watchlist(
-        user_id=user.id,
-        event_id=w.event_id,
-        max_price=Decimal(str(w.max_price)) if w.max_price is not None else None,
+def add_watch(w: WatchIn, response: Response, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    (wl,) = _upsert_watches(db, user.id, [w])
+    invalidate_event_rules([wl.event_id])
+    mark_primary_reads(response, user.id)
+    return _watch_out(wl)
+
+@router.post("/watchlists/bulk")
+def upsert_watches(body: WatchBulkIn, response: Response, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Create or update many watches in one round trip (e.g. importing a whole artist list)."""
+    items = _upsert_watches(db, user.id, body.items)
+    invalidate_event_rules({x.event_id for x in items})
+    mark_primary_reads(response, user.id)
+    return [_watch_out(x) for x in items]
+
+@router.delete("/watchlists")
+def delete_watches(
+    response: Response,
+    event_id: list[int] = Query(...),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Remove this user's watches on the given events in one statement."""
+    res = db.execute(
+        delete(Watchlist).where(Watchlist.user_id == user.id, Watchlist.event_id.in_(event_id))
     )
-    db.add(wl)
     db.commit()
-    db.refresh(wl)
-    return {"id": wl.id, "event_id": wl.event_id, "max_price": float(wl.max_price) if wl.max_price is not None else None}
+    invalidate_event_rules(event_id)
+    mark_primary_reads(response, user.id)
+    return {"deleted": res.rowcount or 0}
 
 @router.get("/watchlists")
-def my_watchlists(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def my_watchlists(user: User = Depends(get_current_reader), db: Session = Depends(get_user_read_db)):
     items = db.scalars(select(Watchlist).where(Watchlist.user_id == user.id)).all()
-    return [{"id": x.id, "event_id": x.event_id, "max_price": float(x.max_price) if x.max_price is not None else None} for x in items]
+    return [_watch_out(x) for x in items]
 
 @router.delete("/watchlists/{watch_id}")
 def delete_watch(
+    response: Response,
     watch_id: int = Path(..., ge=1),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -63,8 +156,11 @@ def delete_watch(
     wl = db.get(Watchlist, watch_id)
     if not wl or wl.user_id != user.id:
         raise HTTPException(status_code=404, detail="Not found")
+    event_id = wl.event_id
     db.delete(wl)
     db.commit()
+    invalidate_event_rules([event_id])
+    mark_primary_reads(response, user.id)
     return {"ok": True}
 
 @router.post("/scan")
@@ -75,6 +171,6 @@ def scan_watchlists_endpoint(db: Session = Depends(get_db)):
     return {"created": created}
 
 @router.get("/notifications")
-def my_notifications(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def my_notifications(user: User = Depends(get_current_reader), db: Session = Depends(get_user_read_db)):
     notes = db.scalars(select(Notification).where(Notification.user_id == user.id)).all()
     return [{"id": n.id, "listing_id": n.listing_id, "created_at": n.created_at.isoformat()} for n in notes]
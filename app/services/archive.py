@@ -0,0 +1,84 @@
+# app/services/archive.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+from app.models import Event, Listing, ListingArchive, Notification, NotificationArchive
+
+# Event.status lifecycle: onsale -> finished (show is over) -> archived (rows
+# moved to cold storage). Only "finished" events are picked up for archiving.
+CLOSED_STATUSES = ("finished", "archived")
+FINISHED_GRACE = timedelta(hours=12)
+
+def mark_finished_events(db: Session, now: datetime | None = None) -> int:
+    """Flip events whose show time (+ grace) has passed to "finished". Returns # updated."""
+    cutoff = (now or datetime.utcnow()) - FINISHED_GRACE
+    res = db.execute(
+        update(Event)
+        .where(Event.when < cutoff, Event.status.not_in(CLOSED_STATUSES))
+        .values(status="finished")
+    )
+    db.commit()
+    return res.rowcount or 0
+
+def _ensure_year_partition(db: Session, year: int) -> None:
+    """Create listings_archive's partition for `year` if the table is partitioned (Postgres)."""
+    if db.bind.dialect.name != "postgresql":
+        return
+    kind = db.scalar(text("SELECT relkind FROM pg_class WHERE relname = 'listings_archive'"))
+    if kind != "p":
+        return
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS listings_archive_y{year} PARTITION OF listings_archive "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    ))
+
+def archive_event(db: Session, ev: Event) -> int:
+    """
+    Move one finished event's listings and notifications into the archive
+    tables and mark it "archived", all in one transaction. Returns # listings moved.
+    """
+    now = datetime.utcnow()
+    _ensure_year_partition(db, ev.when.year)
+
+    listing_ids = select(Listing.id).where(Listing.event_id == ev.id)
+    db.execute(insert(NotificationArchive).from_select(
+        ["id", "user_id", "listing_id", "event_id", "created_at", "archived_at"],
+        select(Notification.id, Notification.user_id, Notification.listing_id,
+               literal(ev.id), Notification.created_at, literal(now))
+        .where(Notification.listing_id.in_(listing_ids)),
+    ))
+    db.execute(delete(Notification).where(Notification.listing_id.in_(listing_ids)))
+
+    cols = ["id", "event_id", "section", "section_id", "row", "seat", "seat_num",
+            "price", "seat_score", "is_verified"]
+    db.execute(insert(ListingArchive).from_select(
+        cols + ["event_when", "archived_at"],
+        select(*[getattr(Listing, c) for c in cols], literal(ev.when), literal(now))
+        .where(Listing.event_id == ev.id),
+    ))
+    moved = db.execute(delete(Listing).where(Listing.event_id == ev.id)).rowcount or 0
+
+    ev.status = "archived"
+    db.commit()
+    return moved
+
+def archive_finished_events(db: Session, max_events: int = 20) -> int:
+    """
+    Scheduled job: advance statuses, then archive up to `max_events` finished
+    events. Every app process runs it, so each event is claimed with
+    SKIP LOCKED and held only until archive_event commits it as "archived".
+    """
+    mark_finished_events(db)
+    moved = 0
+    for _ in range(max_events):
+        ev = db.scalars(
+            select(Event).where(Event.status == "finished").order_by(Event.when)
+            .limit(1).with_for_update(skip_locked=True)
+        ).first()
+        if ev is None:
+            break
+        moved += archive_event(db, ev)
+    return moved
@@ -0,0 +1,123 @@
+# app/services/channels.py
+from __future__ import annotations
+
+import json
+import os
+import smtplib
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import EmailMessage
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models import ChannelRateBucket
+
+@dataclass
+class Digest:
+    """Everything one user should hear about in one delivery."""
+    user_id: str
+    email: str | None
+    items: list[dict] = field(default_factory=list)
+
+class RateLimiter:
+    """
+    Token bucket shared by every worker process. The bucket is a
+    channel_rate_buckets row, refilled and debited under a row lock, so adding
+    outbox workers doesn't multiply the channel's send rate.
+    """
+
+    def __init__(self, channel: str, rate_per_sec: float, burst: int):
+        self.channel = channel
+        self.rate = rate_per_sec
+        self.burst = burst
+
+    def try_acquire(self, db: Session) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available. Commits."""
+        now = datetime.utcnow()
+        insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        db.execute(
+            insert(ChannelRateBucket)
+            .values(channel=self.channel, tokens=float(self.burst), updated_at=now)
+            .on_conflict_do_nothing(index_elements=["channel"])
+        )
+        bucket = db.scalars(
+            select(ChannelRateBucket).where(ChannelRateBucket.channel == self.channel).with_for_update()
+        ).one()
+        elapsed = max((now - bucket.updated_at).total_seconds(), 0.0)
+        tokens = min(self.burst, bucket.tokens + elapsed * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        bucket.tokens = tokens
+        bucket.updated_at = now
+        # release the row lock right away; every worker's sends queue on it
+        db.commit()
+        return wait
+
+class Channel(ABC):
+    name = "base"
+
+    def __init__(self, rate_per_sec: float = 10.0, burst: int = 20):
+        self.limiter = RateLimiter(self.name, rate_per_sec, burst)
+
+    @abstractmethod
+    def send(self, digest: Digest) -> None:
+        """Deliver one digest; raise on failure so the outbox retries it."""
+
+class FileChannel(Channel):
+    """Appends one JSON line per digest. Local dev / tests."""
+    name = "file"
+
+    def __init__(self, path: str | None = None, **kw):
+        super().__init__(**kw)
+        self.path = path or os.getenv("NOTIFY_FILE", "notifications.jsonl")
+        self._lock = threading.Lock()
+
+    def send(self, digest: Digest) -> None:
+        line = json.dumps({"user_id": digest.user_id, "email": digest.email,
+                           "sent_at": datetime.utcnow().isoformat(), "items": digest.items})
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+class SMTPChannel(Channel):
+    name = "email"
+
+    def __init__(self, host: str | None = None, port: int | None = None, sender: str | None = None, **kw):
+        super().__init__(**kw)
+        self.host = host or os.getenv("SMTP_HOST", "localhost")
+        self.port = port or int(os.getenv("SMTP_PORT", "25"))
+        self.sender = sender or os.getenv("SMTP_FROM", "alerts@concertcloud.local")
+
+    def send(self, digest: Digest) -> None:
+        if not digest.email:
+            raise ValueError("user has no email address")
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = digest.email
+        n = len(digest.items)
+        msg["Subject"] = f"{n} new listing{'s' if n != 1 else ''} on your watchlist"
+        msg.set_content("\n".join(
+            f"Event {it.get('event_id')}: section {it.get('section')} row {it.get('row')} - ${it.get('price'):.2f}"
+            for it in digest.items
+        ))
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(msg)
+
+CHANNELS: dict[str, Channel] = {}
+
+def register_channel(channel: Channel) -> None:
+    CHANNELS[channel.name] = channel
+
+def get_channel(name: str) -> Channel:
+    if name not in CHANNELS:
+        raise KeyError(f"unknown notification channel {name!r}")
+    return CHANNELS[name]
+
+register_channel(FileChannel())
+register_channel(SMTPChannel(rate_per_sec=float(os.getenv("SMTP_RATE_PER_SEC", "5")), burst=10))
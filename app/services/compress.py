@@ -0,0 +1,121 @@
+# app/services/compress.py
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Hot events are read by thousands of clients while their inventory is
+# unchanged. The JSON body hash is the payload's version: each (key, encoding)
+# keeps the compressed bytes of its latest version only, so a representation is
+# compressed once per version and then served straight from memory.
+MIN_COMPRESS_BYTES = 1024
+CACHE_MAX_ENTRIES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_cache: OrderedDict[tuple[str, str], tuple[str, bytes]] = OrderedDict()
+_lock = threading.Lock()
+_stats_lock = threading.Lock()
+
+stats = {"responses": 0, "compressed": 0, "cache_hits": 0,
+         "raw_bytes": 0, "sent_bytes": 0, "compress_cpu_seconds": 0.0}
+
+def _pick_encoding(accept: str) -> str | None:
+    offered = {}
+    for part in accept.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.lower()] = q
+    for enc in (("br",) if brotli else ()) + ("gzip",):
+        if offered.get(enc, offered.get("*", 0)) > 0:
+            return enc
+    return None
+
+def _compress(body: bytes, enc: str) -> bytes:
+    if enc == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def _record(**deltas) -> None:
+    # sync routes run in the threadpool; += on a shared dict isn't atomic
+    with _stats_lock:
+        for k, v in deltas.items():
+            stats[k] += v
+
+def stats_snapshot() -> dict:
+    with _stats_lock:
+        return dict(stats)
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+def compressed_json(request: Request, payload, key: str) -> Response:
+    """
+    JSON response negotiated against Accept-Encoding, with an ETag of the body
+    per content-coding (the gzip and br representations get "<hash>-gzip" /
+    "<hash>-br"). `key` names the representation (e.g. "map:42"); its
+    compressed bytes are reused until the body changes. Reports X-Bytes-Saved
+    and Server-Timing.
+    """
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+    version = blake2b(body, digest_size=16).hexdigest()
+    enc = _pick_encoding(request.headers.get("accept-encoding", ""))
+    if len(body) < MIN_COMPRESS_BYTES:
+        enc = None
+    etag = f'"{version}-{enc}"' if enc else f'"{version}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        _record(responses=1, raw_bytes=len(body))
+        return Response(status_code=304, headers=headers)
+
+    if enc is None:
+        _record(responses=1, raw_bytes=len(body), sent_bytes=len(body))
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    cpu = 0.0
+    with _lock:
+        hit = _cache.get((key, enc))
+        if hit and hit[0] == version:
+            _cache.move_to_end((key, enc))
+    cached = bool(hit and hit[0] == version)
+    if cached:
+        data = hit[1]
+    else:
+        # thread_time: the threadpool runs other requests in parallel, process_time would count them too
+        t0 = time.thread_time()
+        data = _compress(body, enc)
+        cpu = time.thread_time() - t0
+        with _lock:
+            _cache[(key, enc)] = (version, data)
+            _cache.move_to_end((key, enc))
+            while len(_cache) > CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+
+    _record(responses=1, raw_bytes=len(body), compressed=1, sent_bytes=len(data),
+            cache_hits=int(cached), compress_cpu_seconds=cpu)
+    headers["Content-Encoding"] = enc
+    headers["X-Bytes-Saved"] = str(len(body) - len(data))
+    headers["Server-Timing"] = f"compress;dur={cpu * 1000:.3f}"
+    return Response(content=data, media_type="application/json", headers=headers)
@@ -0,0 +1,195 @@
+# app/services/export.py
+"""
+Incremental columnar export of listings / watchlists / notifications for
+analytics, so ad-hoc aggregates run on files instead of the OLTP database.
+
+    python -m app.services.export --out exports/ [--format parquet|arrow] [--tables listings,notifications]
+
+Rows are streamed from the read engine with a server-side cursor and written
+chunk by chunk; nothing holds a whole table in memory. Layout:
+
+    <out>/<table>/dt=<YYYY-MM-DD>/part-<HHMMSSffffff>-<n>.parquet
+    <out>/manifest.json    # per table: (marker, id) watermark + every file written
+
+listings and notifications export every row whose change marker
+(listings.updated_at, notifications.created_at) is past the manifest's
+watermark, so later edits such as the section_id backfill are picked up; a
+changed listing appears again in a later file, latest updated_at wins. The
+watermark trails the clock by SETTLE_SECONDS so rows from transactions that
+commit late are not skipped. watchlists are upserted in place without a
+marker, so each run writes a full snapshot (it is small).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric, String, Uuid, select, tuple_
+from app.db import read_engine
+from app.models import Listing, Notification, Watchlist
+
+TABLES = {   # name -> (table, change marker column; None = snapshot)
+    "listings": (Listing.__table__, "updated_at"),
+    "notifications": (Notification.__table__, "created_at"),
+    "watchlists": (Watchlist.__table__, None),
+}
+CHUNK_ROWS = 50_000
+# longest a writing transaction may stay open and still have its rows exported
+SETTLE_SECONDS = 300
+ROWS_PER_FILE = 1_000_000
+
+def _arrow_schema(pa, table):
+    fields = []
+    for c in table.columns:
+        t = c.type
+        if isinstance(t, Uuid):
+            at = pa.string()
+        elif isinstance(t, Boolean):
+            at = pa.bool_()
+        elif isinstance(t, Integer):
+            at = pa.int64()
+        elif isinstance(t, Numeric) and not isinstance(t, Float):
+            at = pa.decimal128(t.precision or 18, t.scale or 0)
+        elif isinstance(t, Float):
+            at = pa.float64()
+        elif isinstance(t, DateTime):
+            at = pa.timestamp("us")
+        elif isinstance(t, String):
+            at = pa.string()
+        else:
+            continue
+        fields.append(pa.field(c.name, at, nullable=c.nullable))
+    return pa.schema(fields)
+
+class _Manifest:
+    def __init__(self, out: Path):
+        self.path = out / "manifest.json"
+        self.data = json.loads(self.path.read_text()) if self.path.exists() else {"tables": {}}
+
+    def table(self, name: str) -> dict:
+        state = self.data["tables"].setdefault(name, {"files": []})
+        state.setdefault("watermark", None)   # [marker iso, id] of the last exported row
+        return state
+
+    def save(self) -> None:
+        # write-then-rename so a crash never leaves a half-written manifest
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, default=str))
+        os.replace(tmp, self.path)
+
+class _PartWriter:
+    """One output file; renamed to its final name once closed."""
+
+    def __init__(self, pa, schema, directory: Path, fmt: str, name: str):
+        self.pa, self.schema, self.fmt, self.name = pa, schema, fmt, name
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.tmp = directory / f".inprogress-{os.getpid()}.{fmt}"
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(self.tmp, schema, compression="zstd")
+        else:
+            import pyarrow.ipc as ipc
+            self.sink = pa.OSFile(str(self.tmp), "wb")
+            self.writer = ipc.new_file(self.sink, schema)
+        self.rows = 0
+        self.first_id = self.last_id = None
+
+    def write(self, batch, min_id, max_id) -> None:
+        self.writer.write_table(batch) if self.fmt == "parquet" else self.writer.write(batch)
+        self.rows += batch.num_rows
+        self.first_id = min_id if self.first_id is None else min(self.first_id, min_id)
+        self.last_id = max_id if self.last_id is None else max(self.last_id, max_id)
+
+    def close(self) -> Path:
+        self.writer.close()
+        if self.fmt != "parquet":
+            self.sink.close()
+        final = self.directory / f"{self.name}.{self.fmt}"
+        os.replace(self.tmp, final)
+        return final
+
+def export_table(name: str, out: Path, fmt: str = "parquet", manifest: _Manifest | None = None) -> int:
+    """Stream one table into columnar files and record them in the manifest. Returns # rows."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:  # pragma: no cover
+        raise RuntimeError("export needs pyarrow: pip install pyarrow") from e
+
+    table, marker = TABLES[name]
+    manifest = manifest or _Manifest(out)
+    state = manifest.table(name)
+    schema = _arrow_schema(pa, table)
+    cols = [table.c[f.name] for f in schema]
+    run_at = datetime.utcnow()
+    stmt = select(*cols)
+    if marker is None:
+        stmt = stmt.order_by(table.c.id)
+    else:
+        mcol = table.c[marker]
+        stmt = stmt.where(mcol <= run_at - timedelta(seconds=SETTLE_SECONDS)).order_by(mcol, table.c.id)
+        if state["watermark"]:
+            w_at, w_id = state["watermark"]
+            stmt = stmt.where(tuple_(mcol, table.c.id) > tuple_(datetime.fromisoformat(w_at), w_id))
+
+    directory = out / name / f"dt={run_at:%Y-%m-%d}"
+    if marker is None:
+        directory = directory / f"snapshot={run_at:%H%M%S}"
+    writer = None
+    parts = 0
+    total = 0
+
+    def finish(w, last_row):
+        path = w.close()
+        state["files"].append({"path": str(path.relative_to(out)), "rows": w.rows,
+                               "min_id": w.first_id, "max_id": w.last_id,
+                               "mode": "snapshot" if marker is None else "incremental",
+                               "exported_at": run_at.isoformat()})
+        if marker is not None:
+            state["watermark"] = [getattr(last_row, marker).isoformat(), last_row.id]
+        manifest.save()
+
+    last_row = None
+    with read_engine.connect().execution_options(stream_results=True, yield_per=CHUNK_ROWS) as conn:
+        result = conn.execute(stmt)
+        for chunk in result.partitions():
+            columns = list(zip(*chunk))
+            arrays = [
+                pa.array([str(v) if v is not None else None for v in col] if pa.types.is_string(f.type) else col,
+                         type=f.type)
+                for f, col in zip(schema, columns)
+            ]
+            batch = pa.Table.from_arrays(arrays, schema=schema)
+            if writer is None:
+                parts += 1
+                writer = _PartWriter(pa, schema, directory, fmt, f"part-{run_at:%H%M%S%f}-{parts:04d}")
+            ids = [r.id for r in chunk]
+            writer.write(batch, min(ids), max(ids))
+            last_row = chunk[-1]
+            total += len(chunk)
+            if writer.rows >= ROWS_PER_FILE:
+                finish(writer, last_row)
+                writer = None
+    if writer is not None:
+        finish(writer, last_row)
+    return total
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default="exports")
+    ap.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    ap.add_argument("--tables", default=",".join(TABLES))
+    args = ap.parse_args(argv)
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = _Manifest(out)
+    for name in args.tables.split(","):
+        rows = export_table(name.strip(), out, args.format, manifest)
+        print(f"[export] {name}: {rows} rows")
+
+if __name__ == "__main__":
+    main()
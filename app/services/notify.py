@@ -1,28 +1,111 @@
 # app/services/notify.py
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.models import Watchlist, Notification, Listing  # <-- absolute import
+from app.models import Event, Watchlist, Notification, Listing  # <-- absolute import
+from app.services.archive import CLOSED_STATUSES
+from app.services.outbox import enqueue
+from app.services.ranking import price_bounds, run_lengths, score_listing, venue_context
+from app.services.watch_index import EventRuleIndex, compile_event_rules, get_event_rules, section_number
+
+def _event_price_bounds(db: Session, event_id: int) -> tuple[float, float]:
+    """price_bounds() over the whole event, aggregated in the database."""
+    where = Listing.event_id == event_id
+    if db.bind.dialect.name == "postgresql":
+        lo, med = db.execute(
+            select(func.min(Listing.price), func.percentile_cont(0.5).within_group(Listing.price)).where(where)
+        ).one()
+        lo = float(lo or 0)
+        return lo, max(float(med or 0), lo + 1e-6)
+    return price_bounds(db.execute(select(Listing.price).where(where)).all())
+
+def _notify_event(db: Session, event_id: int, index: EventRuleIndex, candidates=None) -> int:
+    """
+    Match one event's listings (all of them, or just `candidates`) against its
+    compiled watch index and stage Notification + outbox rows for new
+    (user, listing) pairs. With `candidates`, only their sections and their
+    notification pairs are read, not the event's whole inventory.
+    """
+    if not index.watches:
+        return 0
+    full = candidates is None
+    if full:
+        inventory = candidates = db.scalars(select(Listing).where(Listing.event_id == event_id)).all()
+    ceiling = index.price_ceiling
+    if ceiling is not None:
+        candidates = [x for x in candidates if float(x.price) <= ceiling]
+    if not candidates:
+        return 0
+
+    scores = runs = None
+    if index.needs_score:
+        ev = db.get(Event, event_id)
+        venue_xy, sec_by_id = venue_context(db, ev.venue)
+        p_lo, p_hi = price_bounds(inventory) if full else _event_price_bounds(db, event_id)
+        scores = {x.id: score_listing(x, sec_by_id, venue_xy, p_lo, p_hi) for x in candidates}
+    if index.needs_runs:
+        # a run never leaves its section, so the candidates' sections are enough
+        neighbours = inventory if full else db.scalars(
+            select(Listing).where(Listing.event_id == event_id,
+                                  Listing.section.in_({x.section for x in candidates}))
+        ).all()
+        runs = run_lengths(list(neighbours))
+
+    pairs = select(Notification.user_id, Notification.listing_id)
+    if full:
+        pairs = pairs.join(Listing, Listing.id == Notification.listing_id).where(Listing.event_id == event_id)
+    else:
+        pairs = pairs.where(Notification.listing_id.in_([x.id for x in candidates]))
+    seen = {(uid, lid) for uid, lid in db.execute(pairs)}
+
+    created = 0
+    for m in candidates:
+        hits = index.match(
+            float(m.price), m.is_verified, section_number(m.section),
+            score=scores[m.id] if scores is not None else None,
+            run_len=runs.get(m.id, 0) if runs is not None else None,
+        )
+        for w in hits:
+            if (w.user_id, m.id) in seen:
+                continue
+            seen.add((w.user_id, m.id))
+            db.add(Notification(user_id=w.user_id, listing_id=m.id))
+            enqueue(db, w.user_id, {
+                "watch_id": w.id, "event_id": event_id, "listing_id": m.id,
+                "section": m.section, "row": m.row, "price": float(m.price),
+            })
+            created += 1
+    return created
 
 def scan_watchlists(db: Session) -> int:
     """
-    For each watchlist: find matching listings (<= max_price if set) and
-    create Notification rows if not already created. Returns # created.
+    For each watched live event: match its listings against every watch rule on it
+    (price, section range, seats together, verified, score) and create
+    Notification rows if not already created. Returns # created.
     """
+    by_event: dict[int, list[Watchlist]] = {}
+    live = (
+        select(Watchlist)
+        .join(Event, Event.id == Watchlist.event_id)
+        .where(Event.status.not_in(CLOSED_STATUSES))
+    )
+    for w in db.scalars(live):
+        by_event.setdefault(w.event_id, []).append(w)
+
     created = 0
-    watches = db.scalars(select(Watchlist)).all()
-    for w in watches:
-        stmt = select(Listing).where(Listing.event_id == w.event_id)
-        if w.max_price is not None:
-            stmt = stmt.where(Listing.price <= w.max_price)
-        for m in db.scalars(stmt):
-            exists = db.scalar(
-                select(Notification).where(
-                    Notification.user_id == w.user_id,
-                    Notification.listing_id == m.id,
-                )
-            )
-            if not exists:
-                db.add(Notification(user_id=w.user_id, listing_id=m.id))
-                created += 1
+    for event_id, index in compile_event_rules(by_event).items():
+        created += _notify_event(db, event_id, index)
     db.commit()
     return created
+
+def notify_new_listings(db: Session, listings: list[Listing]) -> int:
+    """
+    Ingestion hook: match only new/changed listings against the watches on
+    their events instead of rescanning everything. Caller commits.
+    """
+    by_event: dict[int, list[Listing]] = {}
+    for x in listings:
+        by_event.setdefault(x.event_id, []).append(x)
+    created = 0
+    for event_id, index in get_event_rules(db, by_event).items():
+        created += _notify_event(db, event_id, index, by_event[event_id])
+    return created
@@ -0,0 +1,190 @@
+# app/services/outbox.py
+from __future__ import annotations
+
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from app.models import OutboxMessage, User
+from app.services.channels import Digest, get_channel
+
+DEFAULT_CHANNEL = os.getenv("NOTIFY_CHANNEL", "file")
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_CAP_SECONDS = 3600
+LEASE_SECONDS = 300  # a "sending" claim older than this is assumed dead and re-claimed
+# stop starting sends this long into a batch and hand the rest back; each
+# group's lease is also renewed right before its send
+BATCH_BUDGET_SECONDS = LEASE_SECONDS / 3
+
+def enqueue(db: Session, user_id, payload: dict, channel: str | None = None) -> None:
+    """Stage a message in the caller's transaction (commit together with the Notification)."""
+    db.add(OutboxMessage(user_id=user_id, channel=channel or DEFAULT_CHANNEL, payload=payload))
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_CAP_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+def claim_batch(db: Session, worker_id: str, limit: int = 50) -> list[OutboxMessage]:
+    """
+    Lock a batch of due rows with FOR UPDATE SKIP LOCKED, mark them "sending"
+    and commit, so concurrent workers never see the same rows and nothing is
+    locked while we talk to the channel. Re-claiming an expired lease counts
+    as an attempt: a message that hangs or kills its worker ends up "failed"
+    after MAX_ATTEMPTS instead of being retried forever.
+    """
+    now = datetime.utcnow()
+    due = or_(
+        and_(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now),
+        and_(OutboxMessage.status == "sending", OutboxMessage.claimed_at < now - timedelta(seconds=LEASE_SECONDS)),
+    )
+    # take every due row of the `limit` longest-waiting users, so each user's
+    # matches end up in one digest
+    users = (
+        select(OutboxMessage.user_id)
+        .where(due)
+        .group_by(OutboxMessage.user_id)
+        .order_by(func.min(OutboxMessage.id))
+        .limit(limit)
+    )
+    stmt = (
+        select(OutboxMessage)
+        .where(due, OutboxMessage.user_id.in_(users))
+        .order_by(OutboxMessage.id)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = []
+    for m in db.scalars(stmt).all():
+        if m.status == "sending":
+            m.attempts += 1
+            m.last_error = f"lease expired (claimed by {m.claimed_by})"[:500]
+            if m.attempts >= MAX_ATTEMPTS:
+                m.status = "failed"
+                m.claimed_by = None
+                continue
+        m.status = "sending"
+        m.claimed_by = worker_id
+        m.claimed_at = now
+        claimed.append(m)
+    db.commit()
+    return claimed
+
+def _still_ours(db: Session, msgs: list[OutboxMessage], worker_id: str) -> list[OutboxMessage]:
+    """Lock and return the rows of a group this worker still holds; another worker may have re-claimed some."""
+    return db.scalars(
+        select(OutboxMessage)
+        .where(OutboxMessage.id.in_([m.id for m in msgs]),
+               OutboxMessage.status == "sending",
+               OutboxMessage.claimed_by == worker_id)
+        .with_for_update()
+    ).all()
+
+def _release(msgs: list[OutboxMessage], at: datetime) -> None:
+    """Hand rows back to the queue without burning an attempt."""
+    for m in msgs:
+        m.status = "pending"
+        m.claimed_by = None
+        m.next_attempt_at = at
+
+def deliver_batch(db: Session, worker_id: str | None = None, limit: int = 50) -> int:
+    """
+    Claim due messages for up to `limit` users, coalesce them into one digest
+    per (user, channel) and send each through its channel. Returns # digests sent.
+
+    Every status change after the claim only touches rows still claimed by
+    this worker, and each group's lease is renewed before its send, so a slow
+    batch can't be re-claimed and delivered twice.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    rows = claim_batch(db, worker_id, limit)
+    if not rows:
+        return 0
+
+    groups: dict[tuple, list[OutboxMessage]] = {}
+    for m in rows:
+        groups.setdefault((m.user_id, m.channel), []).append(m)
+    emails = dict(db.execute(
+        select(User.id, User.email).where(User.id.in_({uid for uid, _ in groups}))
+    ).all())
+
+    started = time.monotonic()
+    sent = 0
+    for (user_id, channel_name), msgs in groups.items():
+        now = datetime.utcnow()
+        msgs = _still_ours(db, msgs, worker_id)
+        if not msgs:
+            db.commit()
+            continue
+        if time.monotonic() - started > BATCH_BUDGET_SECONDS:
+            _release(msgs, now)
+            db.commit()
+            continue
+        try:
+            channel = get_channel(channel_name)
+        except KeyError as e:
+            _fail(msgs, str(e), now, final=True)
+            db.commit()
+            continue
+
+        # renew the lease before the slow part
+        for m in msgs:
+            m.claimed_at = now
+        db.commit()
+
+        wait = channel.limiter.try_acquire(db)
+        if wait:
+            # over the channel's rate: hand the group back without burning an attempt
+            _release(_still_ours(db, msgs, worker_id), now + timedelta(seconds=wait))
+            db.commit()
+            continue
+
+        digest = Digest(user_id=str(user_id), email=emails.get(user_id), items=[m.payload for m in msgs])
+        error = None
+        try:
+            channel.send(digest)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        done = datetime.utcnow()
+        msgs = _still_ours(db, msgs, worker_id)
+        if error:
+            _fail(msgs, error, done)
+        else:
+            for m in msgs:
+                m.status = "sent"
+                m.sent_at = done
+                m.last_error = None
+            sent += 1
+        db.commit()
+    return sent
+
+def _fail(msgs: list[OutboxMessage], error: str, now: datetime, final: bool = False) -> None:
+    for m in msgs:
+        m.attempts += 1
+        m.last_error = error[:500]
+        m.claimed_by = None
+        if final or m.attempts >= MAX_ATTEMPTS:
+            m.status = "failed"
+        else:
+            m.status = "pending"
+            m.next_attempt_at = now + _backoff(m.attempts)
+
+def run_worker(poll_seconds: float = 2.0, limit: int = 50) -> None:
+    """Standalone delivery loop; start as many of these as throughput needs."""
+    from app.db import SessionLocal
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        db = SessionLocal()
+        try:
+            sent = deliver_batch(db, worker_id, limit)
+        finally:
+            db.close()
+        if not sent:
+            time.sleep(poll_seconds)
+
+if __name__ == "__main__":
+    run_worker()
@@ -0,0 +1,129 @@
+# app/services/ranking.py
+from __future__ import annotations
+
+from math import hypot, sqrt
+from statistics import median
+
+from sqlalchemy.orm import Session
+from app.models import Listing
+from app.services.venues import SectionGeo, VenueGeometry, get_venue_geometry
+
+DEFAULT_STAGE = {"stage_x": 500.0, "stage_y": 80.0}
+# stand-in for venues without a map, so sort=best still ranks by seat_score + price
+DEFAULT_VENUE = VenueGeometry(id=0, name="", width=1000, height=700, **DEFAULT_STAGE)
+
+def norm(x: float, lo: float, hi: float) -> float:
+    if hi == lo:
+        return 0.0
+    v = (x - lo) / (hi - lo)
+    return min(1.0, max(0.0, v))
+
+def row_depth(row: str | None) -> int:
+    if not row:
+        return 10
+    if row.isdigit():
+        return int(row)
+    alpha = "".join(ch for ch in row.upper() if ch.isalpha())
+    if not alpha:
+        return 10
+    depth = 0
+    for ch in alpha:
+        depth = depth * 26 + (ord(ch) - 64)  # A=1
+    return depth
+
+def view_score(lst: Listing, sec_by_id: dict[int, SectionGeo], venue_xy: dict) -> float:
+    """
+    Lower is better. Price-independent part of the blend:
+      distance (0.6) + row depth (0.15)
+    """
+    if lst.section_id and lst.section_id in sec_by_id:
+        s = sec_by_id[lst.section_id]
+        dx = s.cx - venue_xy["stage_x"]
+        dy = s.cy - venue_xy["stage_y"]
+        dist = sqrt(dx * dx + dy * dy)
+        dist_n = norm(dist, 0, 1000)  # canvas is ~0..1000
+    else:
+        # fallback if not mapped to a section
+        dist_n = norm(lst.seat_score, 0, 100)
+
+    row_n = norm(row_depth(lst.row), 1, 30)
+
+    return 0.6 * dist_n + 0.15 * row_n
+
+def score_listing(lst: Listing, sec_by_id: dict[int, SectionGeo], venue_xy: dict, p_lo: float, p_hi: float) -> float:
+    """
+    Lower is better. Blend:
+      distance (0.6) + row depth (0.15) + price (0.25)
+    """
+    price_n = norm(float(lst.price), p_lo, p_hi)
+    return view_score(lst, sec_by_id, venue_xy) + 0.25 * price_n
+
+def best_scores(listings: list[Listing], sections_by_id: dict[int, SectionGeo], venue,
+                w_loc: float = 0.7, w_price: float = 0.3) -> dict[int, float]:
+    """
+    Lower is better. The /events/{id}/listings?sort=best blend: stage distance
+    relative to the venue size (seat_score fallback) and price over min..max
+    of the given listings. Anything that claims to show the "best" listings
+    ranks with this (or rank_best), never a copy of it.
+    """
+    if not listings:
+        return {}
+    prices = [float(x.price) for x in listings]
+    pmin, pmax = min(prices), max(prices) or 1.0
+    out = {}
+    for x in listings:
+        sec = sections_by_id.get(x.section_id)
+        if sec:
+            loc = hypot(sec.cx - venue.stage_x, sec.cy - venue.stage_y) / max(venue.width, venue.height)
+        else:
+            loc = (x.seat_score or 100) / 100.0
+        price = (float(x.price) - pmin) / max(pmax - pmin, 1e-6)
+        out[x.id] = w_loc * loc + w_price * price
+    return out
+
+def rank_best(listings: list[Listing], sections_by_id: dict[int, SectionGeo], venue, **weights) -> list[Listing]:
+    """Listings best first by best_scores, ties by id."""
+    scores = best_scores(listings, sections_by_id, venue, **weights)
+    return sorted(listings, key=lambda x: (scores[x.id], x.id))
+
+def price_bounds(items: list[Listing]) -> tuple[float, float]:
+    """Price normalisation range for score_listing: cheapest .. median."""
+    prices = [float(x.price) for x in items] or [0.0]
+    p_lo = min(prices)
+    return p_lo, max(median(prices), p_lo + 1e-6)
+
+def run_lengths(items: list[Listing]) -> dict[int, int]:
+    """Length of the consecutive-seat_num run (same section + row) each listing sits in."""
+    grouped = {}
+    for x in items:
+        key = (x.section_id or 0, x.section or "", x.row or "")
+        grouped.setdefault(key, []).append(x)
+    out = {}
+    for _, arr in grouped.items():
+        arr.sort(key=lambda a: (a.seat_num or 10**9, a.id))
+        run = []
+        last = None
+        for a in arr:
+            if a.seat_num is None:
+                out[a.id] = 0
+                continue
+            if last is None or a.seat_num == last + 1:
+                run.append(a)
+            else:
+                out.update((r.id, len(run)) for r in run)
+                run = [a]
+            last = a.seat_num
+        out.update((r.id, len(run)) for r in run)
+    return out
+
+def together_runs(items: list[Listing], qty: int) -> list[Listing]:
+    """Keep only listings that sit in a run of >= qty consecutive seat_num in one row."""
+    runs = run_lengths(items)
+    return [x for x in items if runs[x.id] >= qty]
+
+def venue_context(db: Session, venue_name: str) -> tuple[dict, dict[int, SectionGeo]]:
+    """Stage position + sections by id for a venue (defaults if unmapped)."""
+    geo = get_venue_geometry(db, venue_name)
+    if not geo:
+        return dict(DEFAULT_STAGE), {}
+    return geo.venue_xy, geo.sections
@@ -0,0 +1,181 @@
+# app/services/sections.py
+from __future__ import annotations
+
+import re
+import threading
+import time
+from datetime import datetime
+from difflib import get_close_matches
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models import Event, Listing, SectionAlias
+from app.services.venues import GEOMETRY_TTL_SECONDS, get_venue_geometry
+
+# Feeds label sections every which way ("Sec 101", "SECTION 101", "101A",
+# "Floor B"). Labels are normalised, then looked up in the venue's section
+# names + reviewed ("manual") aliases, then retried without a seat-block
+# suffix. Anything still unmatched gets a fuzzy candidate, restricted to names
+# with exactly the same numbers ("101" never suggests "1010"); candidates are
+# stored as "suggested" aliases for review and not applied until approved.
+FUZZY_CUTOFF = 0.85
+# the backfill only reads listings past the last id it has seen; every
+# BACKFILL_RESCAN_SECONDS it starts over so approved aliases reach old rows
+BACKFILL_RESCAN_SECONDS = 6 * 3600
+
+_DIGITS = re.compile(r"\d+")
+_DROP_WORDS = re.compile(r"\b(SECTION|SECT|SEC|SCT|BLOCK|BLK)\b")
+_DROP_PREFIX = re.compile(r"\b(SECTION|SECT|SEC|SCT|S|BLOCK|BLK)(?=\d)")   # "SEC101", "S101"
+_SYNONYMS = [(re.compile(r"\bFLOOR\b"), "FLR"), (re.compile(r"\bBALCONY\b"), "BAL"),
+             (re.compile(r"\bMEZZANINE\b"), "MEZZ"), (re.compile(r"\bORCHESTRA\b"), "ORCH")]
+
+def normalize_label(label: str | None) -> str:
+    """"Sec 101" / "SEC101" -> "101", "Floor B" -> "FLRB", "101-a" -> "101A"."""
+    if not label:
+        return ""
+    s = label.upper()
+    for pat, rep in _SYNONYMS:
+        s = pat.sub(rep, s)
+    s = _DROP_PREFIX.sub("", _DROP_WORDS.sub(" ", s))
+    return re.sub(r"[^A-Z0-9]", "", s)
+
+class SectionResolver:
+    """Label -> Section.id for one venue; remembers every label it has seen."""
+
+    def __init__(self, venue_id: int, names: dict[str, int], aliases: dict[str, int]):
+        self.venue_id = venue_id
+        self.known = {**names, **aliases}
+        self.suggested: dict[str, int] = {}   # fuzzy candidates not yet persisted
+        self._memo: dict[str, int | None] = {}
+
+    def resolve(self, label: str | None) -> int | None:
+        key = normalize_label(label)
+        if not key:
+            return None
+        if key in self._memo:
+            return self._memo[key]
+        sid = self.known.get(key)
+        if sid is None:
+            # "101A" / "101W": seat-block suffix on a numbered section
+            m = re.fullmatch(r"(\d+)[A-Z]{1,2}", key)
+            if m:
+                sid = self.known.get(m.group(1))
+        if sid is None:
+            self._suggest(key)
+        self._memo[key] = sid
+        return sid
+
+    def _suggest(self, key: str) -> None:
+        # section numbers carry the meaning; only letters may differ ("FLRB" ~ "FLOORB")
+        digits = _DIGITS.findall(key)
+        pool = [k for k in self.known if _DIGITS.findall(k) == digits]
+        close = get_close_matches(key, pool, n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            self.suggested[key] = self.known[close[0]]
+
+_resolvers: dict[str, tuple[float, SectionResolver | None]] = {}
+_lock = threading.Lock()
+
+def get_resolver(db: Session, venue_name: str) -> SectionResolver | None:
+    """Memoised per venue for GEOMETRY_TTL_SECONDS (None if the venue has no map)."""
+    now = time.monotonic()
+    hit = _resolvers.get(venue_name)
+    if hit and hit[0] > now:
+        return hit[1]
+    geo = get_venue_geometry(db, venue_name)
+    resolver = None
+    if geo:
+        names = {normalize_label(s.name): s.id for s in geo.sections.values()}
+        aliases = dict(db.execute(
+            select(SectionAlias.alias, SectionAlias.section_id)
+            .where(SectionAlias.venue_id == geo.id, SectionAlias.source == "manual")
+        ).all())
+        resolver = SectionResolver(geo.id, names, aliases)
+    with _lock:
+        _resolvers[venue_name] = (now + GEOMETRY_TTL_SECONDS, resolver)
+    return resolver
+
+def _save_suggestions(db: Session, resolvers) -> None:
+    """Queue fuzzy candidates for review; setting source to "manual" approves one."""
+    for r in resolvers:
+        if not r or not r.suggested:
+            continue
+        existing = set(db.scalars(select(SectionAlias.alias).where(
+            SectionAlias.venue_id == r.venue_id, SectionAlias.alias.in_(list(r.suggested))
+        )))
+        for alias, sid in r.suggested.items():
+            if alias not in existing:
+                db.add(SectionAlias(venue_id=r.venue_id, alias=alias, section_id=sid, source="suggested"))
+        r.suggested.clear()
+
+def resolve_section_ids(db: Session, listings: list[Listing]) -> int:
+    """
+    Ingestion hook: fill section_id on listings that lack one, in bulk.
+    Caller commits. Returns # resolved.
+    """
+    todo = [x for x in listings if x.section_id is None and x.section]
+    if not todo:
+        return 0
+    venue_by_event = dict(db.execute(
+        select(Event.id, Event.venue).where(Event.id.in_({x.event_id for x in todo}))
+    ).all())
+    resolvers = {}
+    resolved = 0
+    for x in todo:
+        venue = venue_by_event.get(x.event_id)
+        if venue not in resolvers:
+            resolvers[venue] = get_resolver(db, venue) if venue else None
+        r = resolvers[venue]
+        sid = r.resolve(x.section) if r else None
+        if sid is not None:
+            x.section_id = sid
+            resolved += 1
+    _save_suggestions(db, resolvers.values())
+    return resolved
+
+_backfill_mark = {"after_id": 0, "rescan_at": 0.0}
+
+def backfill_section_ids(db: Session, batch_size: int = 2000, after_id: int | None = None) -> int:
+    """
+    Resolve section_id for existing listings that have none, walking the table
+    by id in batches (one commit per batch). Returns # rows updated.
+    Without after_id, continues from this process's high-water mark, so
+    labels that cannot be resolved are not re-read on every run.
+    """
+    if after_id is None:
+        now = time.monotonic()
+        if now >= _backfill_mark["rescan_at"]:
+            _backfill_mark.update(after_id=0, rescan_at=now + BACKFILL_RESCAN_SECONDS)
+        after_id = _backfill_mark["after_id"]
+        track = True
+    else:
+        track = False
+    updated = 0
+    while True:
+        rows = db.execute(
+            select(Listing.id, Listing.section, Event.venue)
+            .join(Event, Event.id == Listing.event_id)
+            .where(Listing.section_id.is_(None), Listing.section.is_not(None), Listing.id > after_id)
+            .order_by(Listing.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        resolvers = {}
+        changes = []
+        now = datetime.utcnow()
+        for lid, label, venue in rows:
+            if venue not in resolvers:
+                resolvers[venue] = get_resolver(db, venue)
+            r = resolvers[venue]
+            sid = r.resolve(label) if r else None
+            if sid is not None:
+                changes.append({"id": lid, "section_id": sid, "updated_at": now})
+        if changes:
+            db.execute(update(Listing), changes)
+        _save_suggestions(db, resolvers.values())
+        db.commit()
+        updated += len(changes)
+        after_id = rows[-1].id
+        if track:
+            _backfill_mark["after_id"] = after_id
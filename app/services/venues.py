@@ -0,0 +1,175 @@
+# app/services/venues.py
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from math import floor, hypot, sqrt
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Venue, Section
+
+# Venue maps change rarely (admin edits), listings change constantly. Keep a
+# plain-data copy of each venue's geometry per process so ranking endpoints
+# don't reload Venue + Section rows on every request.
+GEOMETRY_TTL_SECONDS = 300
+GRID_CELLS = 16     # spatial index buckets per side of the venue canvas
+
+@dataclass(frozen=True)
+class SectionGeo:
+    id: int
+    name: str
+    cx: float
+    cy: float
+    base_closeness: int
+
+@dataclass(frozen=True)
+class VenueGeometry:
+    id: int
+    name: str
+    width: int
+    height: int
+    stage_x: float
+    stage_y: float
+    sections: dict[int, SectionGeo] = field(default_factory=dict)
+
+    @property
+    def venue_xy(self) -> dict:
+        return {"stage_x": self.stage_x, "stage_y": self.stage_y}
+
+    def dist_n(self, section_id: int) -> float | None:
+        """Stage distance of a section normalised to 0..1 (canvas is ~0..1000)."""
+        s = self.sections.get(section_id)
+        if s is None:
+            return None
+        dx = s.cx - self.stage_x
+        dy = s.cy - self.stage_y
+        return min(1.0, sqrt(dx * dx + dy * dy) / 1000)
+
+    @cached_property
+    def grid(self) -> SectionGrid:
+        """Spatial index over section centroids, built once per cached geometry."""
+        return SectionGrid(self.sections.values(), max(self.width, self.height))
+
+class SectionGrid:
+    """
+    Uniform bucket grid over section centroids. Venues have tens to a few
+    hundred sections spread fairly evenly over the canvas, so fixed square
+    cells beat a tree: rectangle lookups touch only the covered cells and
+    k-nearest grows rings of cells outward from the query point.
+    """
+
+    def __init__(self, sections, extent: float, cells: int = GRID_CELLS):
+        self.cell = max(extent, 1) / cells
+        self.buckets: dict[tuple[int, int], list[SectionGeo]] = {}
+        for s in sections:
+            self.buckets.setdefault(self._key(s.cx, s.cy), []).append(s)
+        keys = self.buckets.keys()
+        self.bounds = (
+            (min(i for i, _ in keys), min(j for _, j in keys), max(i for i, _ in keys), max(j for _, j in keys))
+            if keys else None
+        )
+
+    def _key(self, x: float, y: float) -> tuple[int, int]:
+        return floor(x / self.cell), floor(y / self.cell)
+
+    def in_rect(self, x0: float, y0: float, x1: float, y1: float) -> list[SectionGeo]:
+        """Sections whose centroid lies inside the rectangle (edges included). Coordinates must be finite."""
+        if self.bounds is None:
+            return []
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        imin, jmin, imax, jmax = self.bounds
+        (i0, j0), (i1, j1) = self._key(x0, y0), self._key(x1, y1)
+        i0, j0, i1, j1 = max(i0, imin), max(j0, jmin), min(i1, imax), min(j1, jmax)
+        if i0 > i1 or j0 > j1:
+            return []
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.buckets):
+            # zoomed far out: cheaper to walk the occupied cells than the covered ones
+            cells = [b for (i, j), b in self.buckets.items() if i0 <= i <= i1 and j0 <= j <= j1]
+        else:
+            cells = [self.buckets[(i, j)] for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)
+                     if (i, j) in self.buckets]
+        return [s for b in cells for s in b if x0 <= s.cx <= x1 and y0 <= s.cy <= y1]
+
+    def nearest(self, x: float, y: float, k: int) -> list[tuple[SectionGeo, float]]:
+        """Up to k sections closest to (x, y), nearest first, with their distance. Coordinates must be finite."""
+        if self.bounds is None or k <= 0:
+            return []
+        ci, cj = self._key(x, y)
+        imin, jmin, imax, jmax = self.bounds
+        # rings closer than the occupied box are empty, rings past it too;
+        # each ring is clipped to the box, so a far-off point costs no more than a near one
+        first_ring = max(imin - ci, ci - imax, jmin - cj, cj - jmax, 0)
+        last_ring = max(ci - imin, imax - ci, cj - jmin, jmax - cj, 0)
+        found: list[tuple[float, int, SectionGeo]] = []   # max-heap of the k best via negated distance
+        for r in range(first_ring, last_ring + 1):
+            for i in range(max(ci - r, imin), min(ci + r, imax) + 1):
+                if abs(i - ci) == r:
+                    js = range(max(cj - r, jmin), min(cj + r, jmax) + 1)
+                else:
+                    js = [j for j in (cj - r, cj + r) if jmin <= j <= jmax]
+                for j in js:
+                    for s in self.buckets.get((i, j), ()):
+                        d = hypot(s.cx - x, s.cy - y)
+                        if len(found) < k:
+                            heapq.heappush(found, (-d, -s.id, s))
+                        elif d < -found[0][0]:
+                            heapq.heapreplace(found, (-d, -s.id, s))
+            # anything outside rings 0..r is at least r cells away
+            if len(found) == k and -found[0][0] <= r * self.cell:
+                break
+        return [(s, -nd) for nd, _, s in sorted(found, reverse=True)]
+
+_cache: dict[str, tuple[float, VenueGeometry | None]] = {}
+_lock = threading.Lock()
+
+def _load(db: Session, names: list[str]) -> dict[str, VenueGeometry]:
+    venues = db.scalars(select(Venue).where(Venue.name.in_(names))).all()
+    if not venues:
+        return {}
+    secs = db.scalars(select(Section).where(Section.venue_id.in_([v.id for v in venues]))).all()
+    by_venue: dict[int, dict[int, SectionGeo]] = {v.id: {} for v in venues}
+    for s in secs:
+        by_venue[s.venue_id][s.id] = SectionGeo(s.id, s.name, s.cx, s.cy, s.base_closeness)
+    return {
+        v.name: VenueGeometry(v.id, v.name, v.width, v.height, v.stage_x, v.stage_y, by_venue[v.id])
+        for v in venues
+    }
+
+def get_venue_geometries(db: Session, names) -> dict[str, VenueGeometry | None]:
+    """
+    Geometry for each venue name (None if the venue has no map). Misses are
+    loaded together in two queries, then cached for GEOMETRY_TTL_SECONDS.
+    """
+    now = time.monotonic()
+    out: dict[str, VenueGeometry | None] = {}
+    missing = []
+    for name in set(names):
+        hit = _cache.get(name)
+        if hit and hit[0] > now:
+            out[name] = hit[1]
+        else:
+            missing.append(name)
+    if missing:
+        loaded = _load(db, missing)
+        with _lock:
+            for name in missing:
+                geo = loaded.get(name)
+                _cache[name] = (now + GEOMETRY_TTL_SECONDS, geo)
+                out[name] = geo
+    return out
+
+def get_venue_geometry(db: Session, name: str) -> VenueGeometry | None:
+    return get_venue_geometries(db, [name])[name]
+
+def invalidate_venue(name: str | None = None) -> None:
+    """Drop one venue (or everything) from the cache after editing its map."""
+    with _lock:
+        if name is None:
+            _cache.clear()
+        else:
+            _cache.pop(name, None)
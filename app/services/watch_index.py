@@ -0,0 +1,228 @@
+# app/services/watch_index.py
+from __future__ import annotations
+
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Watchlist
+
+# Every watch on an event gets one bit. Each rule term is pre-compiled into a
+# structure that answers "which watches accept this value?" as a bitmask with
+# one bisect, so matching a listing is a handful of bisects + int ANDs instead
+# of a loop over every watch.
+
+# Compiled indexes are cached per event so an ingestion batch only pays for
+# the bisects. Watch mutations invalidate their event in this process; other
+# processes pick the change up within the TTL, and the periodic full scan
+# recompiles from fresh rows anyway.
+RULES_TTL_SECONDS = 120
+
+def section_number(label: str | None) -> int | None:
+    """Leading number of a free-text section label: "Sec 101" -> 101, "101A" -> 101."""
+    if not label:
+        return None
+    m = re.search(r"\d+", label)
+    return int(m.group()) if m else None
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class _Ceiling:
+    """Watches whose limit is >= value (max_price, max_score). None = no limit."""
+
+    def __init__(self, limits: list[tuple[float | None, int]]):
+        self.free = 0
+        bounded = []
+        for limit, bit in limits:
+            if limit is None:
+                self.free |= 1 << bit
+            else:
+                bounded.append((float(limit), bit))
+        bounded.sort()
+        self.keys = [k for k, _ in bounded]
+        # suffix[i] = watches whose limit is keys[i] or higher
+        self.suffix = [0] * (len(bounded) + 1)
+        for i in range(len(bounded) - 1, -1, -1):
+            self.suffix[i] = self.suffix[i + 1] | (1 << bounded[i][1])
+
+    @property
+    def bounded(self) -> bool:
+        return bool(self.keys)
+
+    def accepts(self, value: float) -> int:
+        return self.suffix[bisect_left(self.keys, value)] | self.free
+
+class _Floor:
+    """Watches whose minimum is <= value (min_qty). None = no minimum."""
+
+    def __init__(self, minimums: list[tuple[int | None, int]]):
+        self.free = 0
+        bounded = []
+        for minimum, bit in minimums:
+            if minimum is None or minimum <= 1:
+                self.free |= 1 << bit
+            else:
+                bounded.append((minimum, bit))
+        bounded.sort()
+        self.keys = [k for k, _ in bounded]
+        # prefix[i] = watches whose minimum is among keys[:i]
+        self.prefix = [0] * (len(bounded) + 1)
+        for i, (_, bit) in enumerate(bounded):
+            self.prefix[i + 1] = self.prefix[i] | (1 << bit)
+
+    @property
+    def bounded(self) -> bool:
+        return bool(self.keys)
+
+    def accepts(self, value: int) -> int:
+        return self.prefix[bisect_right(self.keys, value)] | self.free
+
+class _Ranges:
+    """
+    Watches whose [lo, hi] range contains value (section_from/section_to).
+    Endpoints split the number line into point and gap slots; each slot's mask
+    is precomputed with one sweep, so a lookup is a single bisect.
+    """
+
+    def __init__(self, ranges: list[tuple[int | None, int | None, int]]):
+        self.free = 0
+        starts: dict[int, int] = {}
+        ends: dict[int, int] = {}
+        active = 0
+        for lo, hi, bit in ranges:
+            if lo is None and hi is None:
+                self.free |= 1 << bit
+                continue
+            if lo is None:
+                active |= 1 << bit
+            else:
+                starts[lo] = starts.get(lo, 0) | (1 << bit)
+            if hi is not None:
+                ends[hi] = ends.get(hi, 0) | (1 << bit)
+        self.coords = sorted(set(starts) | set(ends))
+        self.before = active  # gap left of coords[0]
+        self.point = []
+        self.gap = []         # gap[j] = (coords[j], coords[j+1])
+        for c in self.coords:
+            active |= starts.get(c, 0)
+            self.point.append(active)
+            active &= ~ends.get(c, 0)
+            self.gap.append(active)
+
+    @property
+    def bounded(self) -> bool:
+        return bool(self.coords) or bool(self.before)
+
+    def accepts(self, value: int | None) -> int:
+        if value is None:
+            return self.free
+        j = bisect_left(self.coords, value)
+        if j < len(self.coords) and self.coords[j] == value:
+            return self.point[j] | self.free
+        return (self.gap[j - 1] if j else self.before) | self.free
+
+@dataclass(frozen=True)
+class WatchRule:
+    """The Watchlist columns matching needs, detached from any session so it can be cached."""
+    id: int
+    user_id: uuid.UUID
+    max_price: float | None
+    section_from: int | None
+    section_to: int | None
+    min_qty: int | None
+    verified_only: bool
+    max_score: float | None
+
+    @classmethod
+    def from_model(cls, w: Watchlist) -> WatchRule:
+        return cls(w.id, w.user_id, float(w.max_price) if w.max_price is not None else None,
+                   w.section_from, w.section_to, w.min_qty, bool(w.verified_only), w.max_score)
+
+class EventRuleIndex:
+    """All watch rules for one event, compiled for per-listing matching."""
+
+    def __init__(self, watches: list[WatchRule]):
+        self.watches = list(watches)
+        self.all = (1 << len(self.watches)) - 1
+        bits = list(enumerate(self.watches))
+        self.price = _Ceiling([(w.max_price, i) for i, w in bits])
+        self.score = _Ceiling([(w.max_score, i) for i, w in bits])
+        self.qty = _Floor([(w.min_qty, i) for i, w in bits])
+        self.section = _Ranges([(w.section_from, w.section_to, i) for i, w in bits])
+        self.verified = 0
+        for i, w in bits:
+            if w.verified_only:
+                self.verified |= 1 << i
+
+    @property
+    def needs_score(self) -> bool:
+        return self.score.bounded
+
+    @property
+    def needs_runs(self) -> bool:
+        return self.qty.bounded
+
+    @property
+    def price_ceiling(self) -> float | None:
+        """Highest price any watch accepts (None if some watch has no limit)."""
+        if self.price.free or not self.price.keys:
+            return None
+        return self.price.keys[-1]
+
+    def match(self, price: float, verified: bool, section: int | None,
+              score: float | None = None, run_len: int | None = None) -> list[WatchRule]:
+        mask = self.price.accepts(price) & self.section.accepts(section)
+        if not verified:
+            mask &= ~self.verified & self.all
+        # a term the caller didn't compute only passes watches that don't use it
+        mask &= self.score.accepts(score) if score is not None else self.score.free
+        mask &= self.qty.accepts(run_len) if run_len is not None else self.qty.free
+        return [self.watches[i] for i in _iter_bits(mask)]
+
+_cache: dict[int, tuple[float, EventRuleIndex]] = {}
+_lock = threading.Lock()
+
+def compile_event_rules(by_event: dict[int, list[Watchlist]]) -> dict[int, EventRuleIndex]:
+    """Compile each event's index from already-loaded watches and cache it."""
+    expires = time.monotonic() + RULES_TTL_SECONDS
+    out = {e: EventRuleIndex([WatchRule.from_model(w) for w in ws]) for e, ws in by_event.items()}
+    with _lock:
+        for e, index in out.items():
+            _cache[e] = (expires, index)
+    return out
+
+def get_event_rules(db: Session, event_ids) -> dict[int, EventRuleIndex]:
+    """Cached index per event (empty for events nobody watches); misses load in one query."""
+    now = time.monotonic()
+    out: dict[int, EventRuleIndex] = {}
+    missing = []
+    for e in set(event_ids):
+        hit = _cache.get(e)
+        if hit and hit[0] > now:
+            out[e] = hit[1]
+        else:
+            missing.append(e)
+    if missing:
+        by_event: dict[int, list[Watchlist]] = {e: [] for e in missing}
+        for w in db.scalars(select(Watchlist).where(Watchlist.event_id.in_(missing))):
+            by_event[w.event_id].append(w)
+        out.update(compile_event_rules(by_event))
+    return out
+
+def invalidate_event_rules(event_ids=None) -> None:
+    """Drop cached indexes after watches on these events (or any event) changed."""
+    with _lock:
+        if event_ids is None:
+            _cache.clear()
+        else:
+            for e in event_ids:
+                _cache.pop(e, None)
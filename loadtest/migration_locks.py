@@ -0,0 +1,202 @@
+# loadtest/migration_locks.py
+"""
+Run the whole Alembic chain against a large seeded Postgres database and
+measure how long each migration holds blocking locks.
+
+    python -m loadtest.migration_locks --url postgresql+psycopg://.../cc_migrations --listings 2000000
+
+The target database is wiped. The chain is applied up to SEED_AT (the first
+revision with listings) and listings are filled with generate_series. The
+rest of the chain then runs while a second connection samples pg_locks every
+--interval seconds and a probe connection keeps reading/inserting listings
+like live traffic would; watchlists and notifications are filled as soon as
+WATCH_TABLES_AT has created them, so 938132443f40 and everything after it
+meet populated tables.
+Exits non-zero if any lock that blocks writes on a seeded table was held
+longer than --max-lock-seconds.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+ROOT = Path(__file__).resolve().parent.parent
+SEED_AT = "ee4cd20576ee"          # creates artists/venues/events/sections/listings
+WATCH_TABLES_AT = "efd7577a83d6"  # creates watchlists/notifications
+SEEDED_TABLES = ("listings", "notifications", "watchlists", "events")
+# lock modes that conflict with ROW EXCLUSIVE, i.e. block INSERT/UPDATE/DELETE
+WRITE_BLOCKING = ("ShareLock", "ShareRowExclusiveLock", "ExclusiveLock", "AccessExclusiveLock")
+
+# users is created by Base.metadata.create_all in dev, never by a migration,
+# and 938132443f40 expects its autogenerated unique constraint to exist.
+USERS_DDL = """
+CREATE TABLE IF NOT EXISTS users (
+    id uuid PRIMARY KEY,
+    email varchar(320) NOT NULL UNIQUE,
+    password_hash varchar NOT NULL,
+    full_name varchar,
+    is_active boolean NOT NULL
+)
+"""
+
+def _alembic(url: str):
+    from alembic.config import Config
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "alembic"))
+    cfg.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return cfg
+
+def reset(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+        conn.execute(text(USERS_DDL))
+
+def seed_listings(engine, listings: int) -> None:
+    """Schema as of SEED_AT: no seat_num yet."""
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO artists (name) VALUES ('Migration Artist')"))
+        conn.execute(text(
+            "INSERT INTO venues (name, width, height, stage_x, stage_y) VALUES ('Migration Arena', 1000, 700, 500, 80)"
+        ))
+        conn.execute(text(
+            "INSERT INTO events (artist_id, venue, \"when\", status) "
+            "SELECT 1, 'Migration Arena', now() + (g || ' days')::interval, 'onsale' FROM generate_series(1, 50) g"
+        ))
+        conn.execute(text(
+            "INSERT INTO listings (event_id, section, row, seat, price, seat_score, is_verified) "
+            "SELECT 1 + g % 50, (101 + g % 40)::text, chr(65 + g % 20), (g % 30)::text, "
+            "       40 + (g % 500), g % 100, (g % 5) <> 0 "
+            "FROM generate_series(1, :n) g"
+        ), {"n": listings})
+        conn.execute(text("ANALYZE"))
+
+def seed_watch_tables(engine, listings: int, users: int) -> None:
+    """Schema as of WATCH_TABLES_AT: notifications has no created_at yet."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, password_hash, is_active) "
+            "SELECT md5(g::text)::uuid, 'm' || g || '@example.com', 'x', true FROM generate_series(1, :n) g"
+        ), {"n": users})
+        # duplicates on purpose: the unique (user_id, event_id) migration must merge them
+        conn.execute(text(
+            "INSERT INTO watchlists (user_id, event_id, max_price) "
+            "SELECT md5((g % :u)::text)::uuid, 1 + g % 50, 100 + g % 300 FROM generate_series(1, :n) g"
+        ), {"u": users, "n": users * 3})
+        conn.execute(text(
+            "INSERT INTO notifications (user_id, listing_id) "
+            "SELECT DISTINCT md5((g % :u)::text)::uuid, 1 + (g * 7) % :l FROM generate_series(1, :n) g"
+        ), {"u": users, "l": listings, "n": users * 20})
+        conn.execute(text("ANALYZE"))
+
+class LockSampler(threading.Thread):
+    """Polls pg_locks; tracks first/last sighting of each (relation, mode, pid)."""
+
+    def __init__(self, engine, interval: float):
+        super().__init__(daemon=True)
+        self.engine, self.interval = engine, interval
+        self.stop = threading.Event()
+        self.seen: dict[tuple, list[float]] = {}
+
+    def run(self) -> None:
+        with self.engine.connect() as conn:
+            while not self.stop.is_set():
+                now = time.monotonic()
+                rows = conn.execute(text(
+                    "SELECT c.relname, l.mode, l.pid FROM pg_locks l "
+                    "JOIN pg_class c ON c.oid = l.relation "
+                    "WHERE l.granted AND l.pid <> pg_backend_pid() AND c.relname = ANY(:tables)"
+                ), {"tables": list(SEEDED_TABLES)}).all()
+                for rel, mode, pid in rows:
+                    self.seen.setdefault((rel, mode, pid), [now, now])[1] = now
+                conn.commit()
+                time.sleep(self.interval)
+
+    def holds(self) -> list[tuple[str, str, float]]:
+        out = {}
+        for (rel, mode, _), (first, last) in self.seen.items():
+            out[(rel, mode)] = max(out.get((rel, mode), 0.0), last - first + self.interval)
+        return sorted(((r, m, d) for (r, m), d in out.items()), key=lambda t: -t[2])
+
+class Probe(threading.Thread):
+    """Live-traffic stand-in: read + insert a listing in a loop, record the slowest round."""
+
+    def __init__(self, engine):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.stop = threading.Event()
+        self.worst = 0.0
+        self.errors = 0
+
+    def run(self) -> None:
+        while not self.stop.is_set():
+            t0 = time.monotonic()
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text("SET LOCAL statement_timeout = '60s'"))
+                    conn.execute(text("SELECT id FROM listings WHERE event_id = 1 LIMIT 20")).all()
+                    conn.execute(text(
+                        "INSERT INTO listings (event_id, section, row, seat, price, seat_score, is_verified) "
+                        "VALUES (1, '101', 'A', '1', 99, 50, true)"
+                    ))
+            except Exception:
+                self.errors += 1
+            self.worst = max(self.worst, time.monotonic() - t0)
+            time.sleep(0.05)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", required=True, help="Postgres URL of a throwaway database")
+    ap.add_argument("--listings", type=int, default=1_000_000)
+    ap.add_argument("--users", type=int, default=20_000)
+    ap.add_argument("--interval", type=float, default=0.05)
+    ap.add_argument("--max-lock-seconds", type=float, default=2.0)
+    args = ap.parse_args(argv)
+
+    from alembic import command
+
+    engine = create_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        print("migration lock measurement needs Postgres", file=sys.stderr)
+        return 2
+    cfg = _alembic(args.url)
+
+    reset(engine)
+    command.upgrade(cfg, SEED_AT)
+    t0 = time.monotonic()
+    seed_listings(engine, args.listings)
+    print(f"seeded {args.listings} listings in {time.monotonic() - t0:.1f}s")
+
+    sampler, probe = LockSampler(engine, args.interval), Probe(engine)
+    sampler.start()
+    probe.start()
+    t0 = time.monotonic()
+    try:
+        command.upgrade(cfg, WATCH_TABLES_AT)
+        # plain INSERTs into tables created a moment ago: no write-blocking locks to sample
+        seed_watch_tables(engine, args.listings, args.users)
+        command.upgrade(cfg, "head")
+    finally:
+        sampler.stop.set()
+        probe.stop.set()
+        sampler.join()
+        probe.join()
+    print(f"upgrade {SEED_AT} -> head took {time.monotonic() - t0:.1f}s")
+
+    failed = False
+    print(f"{'table':<16}{'lock mode':<26}{'held (s)':>10}")
+    for rel, mode, held in sampler.holds():
+        flag = ""
+        if mode in WRITE_BLOCKING and held > args.max_lock_seconds:
+            flag, failed = "  <-- blocks writes too long", True
+        print(f"{rel:<16}{mode:<26}{held:>10.2f}{flag}")
+    print(f"probe: worst read+insert round {probe.worst:.2f}s, {probe.errors} errors")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+# loadtest/run.py
+"""
+On-sale spike replay against a locally running API.
+
+Open-loop load: requests arrive on a schedule (Poisson around the arrival
+curve) whether or not earlier ones finished, like fans hitting refresh. Each
+arrival picks a route from the traffic mix. Reports p50/p95/p99 per route,
+error rate (any 4xx/5xx or transport failure; 4xx also shown on its own) and
+DB pool saturation (polled from /metrics/pool, judged per uvicorn worker since
+each has its own pools), and saves the run to loadtest/runs/ for comparison
+across commits. The together-seats path is exercised through /frontier, the
+live handler that implements together=true.
+
+    # seed a fresh DB, start uvicorn on it, run a 60s spike, compare to a baseline
+    DATABASE_URL=sqlite:///load.db python -m loadtest.run --seed --start-app \\
+        --curve spike --peak-rps 300 --duration 60 --compare loadtest/runs/<earlier>.json
+
+Mix syntax: name=weight,... over map, listings_best, listings_cheap, frontier,
+add_watch, my_watchlists, notifications, scan.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from jose import jwt
+
+RUNS_DIR = Path(__file__).parent / "runs"
+DEFAULT_MIX = "map=30,listings_best=35,listings_cheap=10,frontier=5,add_watch=10,my_watchlists=5,notifications=4,scan=1"
+
+# ---------- traffic ----------
+def _scenarios(event_id: int):
+    return {
+        "map": ("GET", f"/events/{event_id}/map", None, False),
+        "listings_best": ("GET", f"/events/{event_id}/listings?sort=best", None, False),
+        "listings_cheap": ("GET", f"/events/{event_id}/listings?sort=cheapest", None, False),
+        "frontier": ("GET", f"/events/{event_id}/frontier?together=true&qty=4", None, False),
+        "add_watch": ("POST", "/watch/watchlists", {"event_id": event_id, "max_price": 250}, True),
+        "my_watchlists": ("GET", "/watch/watchlists", None, True),
+        "notifications": ("GET", "/watch/notifications", None, True),
+        "scan": ("POST", "/watch/scan", None, False),
+    }
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        mix[name.strip()] = float(w or 1)
+    return mix
+
+def rate_at(curve: str, t: float, duration: float, peak: float) -> float:
+    """Requests/second at time t for the chosen arrival curve."""
+    x = t / duration
+    if curve == "constant":
+        return peak
+    if curve == "ramp":
+        return peak * min(1.0, x * 2)
+    if curve == "spike":
+        # quiet pre-sale, doors open at 20%: near-vertical jump, slow decay
+        if x < 0.2:
+            return peak * 0.05
+        return peak * max(0.1, math.exp(-(x - 0.2) * 4))
+    raise ValueError(f"unknown curve {curve!r}")
+
+def percentile(sorted_vals: list[float], p: float) -> float | None:
+    if not sorted_vals:
+        return None
+    k = (len(sorted_vals) - 1) * p
+    lo, hi = math.floor(k), math.ceil(k)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+# ---------- run ----------
+async def _fire(client, name, spec, token, results):
+    method, path, body, auth = spec
+    headers = {"Accept-Encoding": "gzip, br"}
+    if auth and token:
+        headers["Authorization"] = f"Bearer {token}"
+    t0 = time.perf_counter()
+    try:
+        r = await client.request(method, path, json=body, headers=headers)
+        ok = r.status_code < 400
+        status = r.status_code
+    except httpx.HTTPError as e:
+        ok, status = False, type(e).__name__
+    results.append((name, time.perf_counter() - t0, ok, status))
+
+async def _poll_pool(client, samples, stop):
+    while not stop.is_set():
+        try:
+            r = await client.get("/metrics/pool")
+            samples.append(r.json())
+        except (httpx.HTTPError, ValueError):
+            pass
+        await asyncio.sleep(0.5)
+
+async def run(base_url: str, event_id: int, user_ids: list[str], mix: dict[str, float],
+              curve: str, peak_rps: float, duration: float, max_in_flight: int) -> dict:
+    secret = os.getenv("JWT_SECRET", "please-change-me")
+    tokens = [jwt.encode({"sub": uid}, secret, algorithm="HS256") for uid in user_ids] or [None]
+    scenarios = _scenarios(event_id)
+    names = [n for n in mix if n in scenarios]
+    weights = [mix[n] for n in names]
+
+    results, pool_samples = [], []
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        stop = asyncio.Event()
+        poller = asyncio.create_task(_poll_pool(client, pool_samples, stop))
+        tasks = set()
+        start = time.perf_counter()
+        t = 0.0
+        while t < duration:
+            rate = max(rate_at(curve, t, duration, peak_rps), 0.1)
+            t += random.expovariate(rate)
+            delay = start + t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = random.choices(names, weights)[0]
+            task = asyncio.create_task(_fire(client, name, scenarios[name], random.choice(tokens), results))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        stop.set()
+        await poller
+        wall = time.perf_counter() - start
+    return summarize(results, pool_samples, wall)
+
+def summarize(results, pool_samples, wall: float) -> dict:
+    by_route: dict[str, list] = {}
+    for name, dt, ok, status in results:
+        by_route.setdefault(name, []).append((dt, ok, status))
+    routes = {}
+    for name, rows in sorted(by_route.items()):
+        lat = sorted(dt for dt, _, _ in rows)
+        errors = sum(1 for _, ok, _ in rows if not ok)
+        client_errors = sum(1 for _, _, st in rows if isinstance(st, int) and 400 <= st < 500)
+        routes[name] = {
+            "count": len(rows),
+            "p50_ms": round(percentile(lat, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(lat, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(lat, 0.99) * 1000, 2),
+            "error_rate": round(errors / len(rows), 4),
+            "client_error_rate": round(client_errors / len(rows), 4),
+        }
+    pool = {}
+    for engine_name in ("primary", "read"):
+        # a sample describes only the worker that answered it: compare it to
+        # that worker's own capacity and keep per-worker figures
+        by_worker: dict = {}
+        for s in pool_samples:
+            p = s.get(engine_name, {})
+            if p.get("checked_out") is None:
+                continue
+            cap = (p["size"] or 0) + (p["max_overflow"] or 0) if p.get("size") is not None else None
+            by_worker.setdefault(s.get("pid"), []).append((p["checked_out"], cap))
+        if not by_worker:
+            continue
+        per_worker = {
+            str(pid): {
+                "samples": len(rows),
+                "max_checked_out": max(u for u, _ in rows),
+                "saturated_fraction": round(sum(1 for u, c in rows if c and u >= c) / len(rows), 4),
+            }
+            for pid, rows in by_worker.items()
+        }
+        rows = [r for rs in by_worker.values() for r in rs]
+        pool[engine_name] = {
+            "workers": len(by_worker),
+            "max_checked_out": max(u for u, _ in rows),
+            "avg_checked_out": round(sum(u for u, _ in rows) / len(rows), 2),
+            "capacity": max((c for _, c in rows if c is not None), default=None),
+            "saturated_fraction": round(sum(1 for u, c in rows if c and u >= c) / len(rows), 4),
+            "worst_worker_saturated_fraction": max(w["saturated_fraction"] for w in per_worker.values()),
+            "per_worker": per_worker,
+        }
+    total = len(results)
+    return {
+        "requests": total,
+        "wall_seconds": round(wall, 2),
+        "achieved_rps": round(total / wall, 2) if wall else None,
+        "error_rate": round(sum(1 for r in results if not r[2]) / total, 4) if total else None,
+        "client_error_rate": round(sum(1 for r in results if isinstance(r[3], int) and 400 <= r[3] < 500) / total, 4)
+                             if total else None,
+        "routes": routes,
+        "pool": pool,
+    }
+
+# ---------- reporting ----------
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=Path(__file__).parent, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "nogit"
+
+def save(report: dict, config: dict) -> Path:
+    RUNS_DIR.mkdir(exist_ok=True)
+    rev = _git_rev()
+    path = RUNS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{rev}.json"
+    path.write_text(json.dumps({"commit": rev, "config": config, "report": report}, indent=2))
+    return path
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    print(f"{report['requests']} requests in {report['wall_seconds']}s "
+          f"({report['achieved_rps']} rps), error rate {report['error_rate']}")
+    print(f"{'route':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'err':>8}{'4xx':>8}")
+    base_routes = (baseline or {}).get("routes", {})
+    for name, r in report["routes"].items():
+        line = (f"{name:<16}{r['count']:>7}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+                f"{r['error_rate']:>8}{r.get('client_error_rate', 0):>8}")
+        b = base_routes.get(name)
+        if b:
+            line += f"   p95 {r['p95_ms'] - b['p95_ms']:+.1f}ms  p99 {r['p99_ms'] - b['p99_ms']:+.1f}ms"
+        print(line)
+    for name, p in report["pool"].items():
+        print(f"pool[{name}]: {p['workers']} worker(s), max {p['max_checked_out']}/{p['capacity']} checked out "
+              f"per worker, avg {p['avg_checked_out']}, saturated {p['saturated_fraction']:.1%} of samples "
+              f"(worst worker {p['worst_worker_saturated_fraction']:.1%})")
+
+def _wait_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"app at {base_url} did not become ready")
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8765")
+    ap.add_argument("--event-id", type=int, help="existing event to hit (default: seed a new one)")
+    ap.add_argument("--seed", action="store_true", help="seed listings/users first (uses DATABASE_URL)")
+    ap.add_argument("--listings", type=int, default=5000)
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--start-app", action="store_true", help="launch uvicorn for the run")
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers when --start-app")
+    ap.add_argument("--mix", default=DEFAULT_MIX)
+    ap.add_argument("--curve", choices=("constant", "ramp", "spike"), default="spike")
+    ap.add_argument("--peak-rps", type=float, default=200)
+    ap.add_argument("--duration", type=float, default=60)
+    ap.add_argument("--max-in-flight", type=int, default=500)
+    ap.add_argument("--compare", help="earlier run JSON to diff against")
+    args = ap.parse_args(argv)
+
+    event_id = args.event_id
+    if args.seed or event_id is None:
+        from loadtest.seed import seed
+        seeded = seed(args.listings, args.users)
+        event_id, user_ids = seeded["event_id"], seeded["user_ids"]
+    else:
+        # reusing an event: sign requests as users that already exist
+        from loadtest.seed import existing_user_ids
+        user_ids = existing_user_ids(args.users)
+        needs_auth = any(_scenarios(event_id)[n][3] for n, w in parse_mix(args.mix).items()
+                         if w > 0 and n in _scenarios(event_id))
+        if needs_auth and not user_ids:
+            ap.error("no users in DATABASE_URL to sign requests as; pass --seed or drop the authenticated routes from --mix")
+
+    app_proc = None
+    if args.start_app:
+        port = args.base_url.rsplit(":", 1)[-1]
+        app_proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", port, "--workers", str(args.workers)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    try:
+        _wait_ready(args.base_url)
+        report = asyncio.run(run(args.base_url, event_id, user_ids, parse_mix(args.mix),
+                                 args.curve, args.peak_rps, args.duration, args.max_in_flight))
+    finally:
+        if app_proc:
+            app_proc.terminate()
+            app_proc.wait(timeout=10)
+
+    config = {k: v for k, v in vars(args).items() if k != "compare"} | {"event_id": event_id}
+    path = save(report, config)
+    baseline = json.loads(Path(args.compare).read_text())["report"] if args.compare else None
+    print_report(report, baseline)
+    print(f"saved {path}")
+
+if __name__ == "__main__":
+    main()
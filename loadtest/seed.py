@@ -0,0 +1,80 @@
+# loadtest/seed.py
+"""
+Seed a database for load runs: one venue map, one on-sale event with a few
+thousand listings (rows of consecutive seats, so together=true has work to do)
+and a pool of users. Prints the event id.
+
+    DATABASE_URL=... python -m loadtest.seed --listings 5000 --users 500
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.db import engine, SessionLocal
+from app.models import Base, Artist, Venue, Section, Event, Listing, User
+
+def seed(listings: int, users: int, sections: int = 40, rng_seed: int = 7) -> dict:
+    rng = random.Random(rng_seed)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:8]
+        artist = Artist(name=f"Load Artist {tag}")
+        venue = Venue(name=f"Load Arena {tag}")
+        db.add_all([artist, venue])
+        db.flush()
+
+        secs = []
+        for i in range(sections):
+            # two rings of sections around the stage
+            ring = 1 if i < sections // 2 else 2
+            x = 500 + (ring * 180) * (((i % (sections // 2)) / (sections // 2)) * 2 - 1)
+            y = 80 + ring * 150 + rng.uniform(0, 60)
+            secs.append(Section(venue_id=venue.id, name=str(101 + i), cx=x, cy=y,
+                                base_closeness=rng.randint(10, 90)))
+        db.add_all(secs)
+        ev = Event(artist_id=artist.id, venue=venue.name, when=datetime.utcnow() + timedelta(days=30))
+        db.add(ev)
+        db.flush()
+
+        made = 0
+        while made < listings:
+            s = rng.choice(secs)
+            row = rng.choice("ABCDEFGHJKLMNPQRST")
+            start = rng.randint(1, 20)
+            for k in range(rng.randint(1, 6)):
+                db.add(Listing(
+                    event_id=ev.id, section=f"Sec {s.name}", section_id=s.id, row=row,
+                    seat=str(start + k), seat_num=start + k,
+                    price=Decimal(rng.randint(40, 600)), seat_score=rng.randint(0, 100),
+                    is_verified=rng.random() < 0.8,
+                ))
+                made += 1
+        people = [User(id=uuid.uuid4(), email=f"load-{tag}-{i}@example.com", password_hash="x")
+                  for i in range(users)]
+        db.add_all(people)
+        db.commit()
+        return {"event_id": ev.id, "user_ids": [str(u.id) for u in people]}
+    finally:
+        db.close()
+
+def existing_user_ids(limit: int) -> list[str]:
+    """Users already in the database, for runs against a previously seeded event."""
+    db = SessionLocal()
+    try:
+        return [str(uid) for uid in db.scalars(select(User.id).limit(limit))]
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--listings", type=int, default=5000)
+    ap.add_argument("--users", type=int, default=500)
+    args = ap.parse_args()
+    print(seed(args.listings, args.users)["event_id"])